@@ -1,440 +1,882 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, ElementClickInterceptedException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, ElementClickInterceptedException, JavascriptException, WebDriverException
 from selenium.webdriver.common.action_chains import ActionChains
-import json
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
 import re
-
-# Настройки браузера
-options = webdriver.ChromeOptions()
-options.add_argument('--headless')
-options.add_argument('--disable-gpu')
-options.add_argument('--no-sandbox')
-options.add_argument('--disable-dev-shm-usage')
-
-driver = webdriver.Chrome(options=options)
-
-base_url = "https://www.vangoghmuseum.nl/nl/collectie"
-image_data = []
-image_id = 1
+import sys
+
+from field_spec import compile_spec
+from browser import DriverPool, NetworkCapture, create_driver, measure_page, page_source, resource_report
+from governor import governor
+from http_client import fetch_json
+from json_api import find_links, next_page_url
+from metrics import MetricsExporter, metrics
+from snapshots import SnapshotArchive
+from retry import breakers, retry_call
+from storage import CrawlState, JsonLinesWriter, export_json_array, iter_jsonl, url_key
+from waits import (
+    wait_for_dom_quiet,
+    wait_for_network_idle,
+    wait_for_new_items,
+    wait_stats,
+    wait_until,
+)
+
+# Переменная окружения VANGOGH_BASE_URL позволяет запустить скрапер на локальной
+# копии страниц (см. fixture_server.py)
+base_url = os.environ.get("VANGOGH_BASE_URL", "https://www.vangoghmuseum.nl") + "/nl/collectie"
 max_images = 5036
+# Сколько детальных страниц обрабатывается параллельно (по драйверу на поток)
+max_workers = 4
+# С какого лимита одновременных запросов к музею начинает governor; дальше лимит
+# растёт, пока сайт отвечает без ошибок, но не выше max_workers
+governor_initial = 2
+# Как извлекать данные детальной страницы: "js" - одним скриптом, "stepwise" - через WebDriver
+detail_extractor = "js"
+# Сколько секунд скрипт ждёт загрузки детальной страницы и раскрытия вкладок
+detail_timeout = 20
+# Какие запросы браузер не выполняет (см. browser.BLOCKING_PROFILES) на детальных
+# страницах и при прокрутке коллекции. Адреса картинок берутся из атрибутов, поэтому
+# сами картинки не нужны; если сетка перестанет расти, для обхода можно указать "none"
+detail_blocking = "lean"
+discovery_blocking = "lean"
+# Верхняя граница ожидания новых картин после прокрутки (секунды)
+scroll_timeout = 10
 download_folder = "vangogh_images_test"
-
-# Создание папки для загрузки изображений
-if not os.path.exists(download_folder):
-    os.makedirs(download_folder)
+output_jsonl = "vangogh_images_test.jsonl"
+output_json = "vangogh_images_test.json"
+# Записи называются стабильным ключом (vgm-<номер объекта>); при экспорте они
+# нумеруются в порядке обнаружения в поле "id" (None - без номеров)
+export_alias = "id"
+# Ссылки, найденные на этапе обхода коллекции: {"image_url", "detail_url"} на строку
+links_jsonl = "vangogh_links.jsonl"
+# Как находить ссылки на детальные страницы:
+#   "scroll"  - прокруткой сетки и чтением DOM
+#   "capture" - из JSON-ответов, которыми сайт заполняет сетку (лог производительности
+#               Chrome); если в адресе ответа есть номер страницы или смещение, остальные
+#               страницы запрашиваются напрямую по HTTP, иначе - прокрутка
+#   "api"     - сразу по HTTP начиная с api_url (постранично)
+# URL изображения из API может отличаться от data-src в сетке, поэтому режим лучше
+# не менять посреди обхода с сохранённым состоянием
+discovery_mode = "capture"
+# Первая страница JSON API коллекции для режима "api"
+api_url = None
+# Состояние обхода для продолжения после перезапуска (удалите файл для обхода с нуля)
+state_db = "vangogh_state.sqlite3"
+# Повторы детальной страницы при ошибках браузера и базовая пауза между ними (секунды)
+retry_attempts = 3
+retry_base_delay = 2
+# После скольких ошибок подряд запросы к музею приостанавливаются и на сколько секунд
+breaker_threshold = 5
+breaker_reset = 30
+# Метрики этапов: JSON-файл (обновляется раз в metrics_interval секунд)
+# и порт HTTP-сервера с /metrics для Prometheus (None - не запускать)
+metrics_file = "vangogh_metrics.json"
+metrics_interval = 10
+metrics_port = None
+# Архив сжатых снимков детальных страниц с раскрытыми вкладками (None - не сохранять)
+snapshot_dir = "vangogh_snapshots"
+# Архив текущего запуска (создаётся в main)
+archive = None
 
 def click_with_retry(driver, element, timeout=20):
     """
     Пытается кликнуть по элементу, обрабатывая ElementClickInterceptedException.
     Использует ActionChains для прокрутки и клика, а также JavaScript как запасной вариант.
     """
+    with metrics.timed("accordion_click"):
+        try:
+            # Ожидаем, пока элемент станет видимым
+            WebDriverWait(driver, timeout).until(
+                EC.visibility_of(element)
+            )
+            # Прокручиваем до элемента
+            ActionChains(driver).move_to_element(element).perform()
+
+            # Ожидаем, пока элемент станет кликабельным
+            clickable_element = WebDriverWait(driver, timeout).until(
+                EC.element_to_be_clickable(element)
+            )
+            # Пытаемся кликнуть по элементу
+            clickable_element.click()
+        except ElementClickInterceptedException:
+            # Если клик был перехвачен, ждем немного и пробуем снова
+            print("Клик по элементу перехвачен, ждем и пробуем еще раз...")
+            # Ждём, пока перекрывающий элемент (анимация, баннер) не перестанет меняться
+            wait_for_dom_quiet(driver, quiet_ms=300, timeout=2, name="click_intercepted")
+            # Используем JavaScript для клика
+            driver.execute_script("arguments[0].click();", element)
+        except TimeoutException:
+            print(f"Элемент не стал кликабельным после {timeout} секунд")
+
+# Скрипт, который за один запрос к WebDriver возвращает изображения сетки коллекции
+# (data-src или src, как в get_attribute) и ссылки на детальные страницы для
+# каждого изображения внутри <a>
+GRID_INDEX_SCRIPT = """
+const srcOf = (img) => img.getAttribute("data-src") || img.src;
+const images = Array.from(
+  document.getElementsByClassName("collection-art-object-item-image")
+).map(srcOf);
+const links = [];
+for (const a of document.getElementsByTagName("a")) {
+  const img = a.querySelector("img");
+  if (img) links.push([srcOf(img), a.href]);
+}
+return {images: images, links: links};
+"""
+
+
+def read_grid(driver):
+    """
+    Считывает сетку коллекции одним вызовом JavaScript.
+    Возвращает список URL изображений и индекс "URL изображения -> ссылка на детальную страницу".
+    """
+    grid = driver.execute_script(GRID_INDEX_SCRIPT)
+    detail_index = {}
+    for src, href in grid["links"]:
+        # Как и при поиске по всем <a>, берётся первая ссылка с этим изображением
+        if src and src not in detail_index:
+            detail_index[src] = href
+    return grid["images"], detail_index
+
+
+def new_links(image_urls, processed_links):
+    """Оставляет URL изображений, которые ещё не обрабатывались."""
+    return [
+        link
+        for link in image_urls
+        if link
+        and link != f"{base_url}/default.jpg"
+        and link not in processed_links
+    ]
+
+
+
+# Вкладки детальной страницы, которые нужно раскрыть
+VANGOGH_ACCORDIONS = ["Objectgegevens", "Tentoonstellingen", "Literatuur"]
+
+# Скрипт для execute_async_script: за один запрос к WebDriver дожидается
+# заголовка, раскрывает вкладки и возвращает все поля картины. Аргументы:
+# названия вкладок и таймаут в мс. Возвращает null, если страница не загрузилась.
+VANGOGH_EXTRACT_SCRIPT = r"""
+const [accordionTitles, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const deadline = Date.now() + timeoutMs;
+
+const one = (sel, root) => (root || document).querySelector(sel);
+const all = (sel, root) => Array.from((root || document).querySelectorAll(sel));
+const text = (el) => (el ? el.innerText.trim() : null);
+const xpath = (expr) => document.evaluate(
+  expr, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+
+function accordion(title) {
+  const heading = xpath(
+    "//h4[contains(@class, 'accordion-item-button') and contains(., '" + title + "')]"
+  );
+  if (!heading) return null;
+  return {
+    button: Array.from(heading.children).find((el) => el.tagName === "BUTTON") || null,
+    item: heading.closest(".accordion-item"),
+  };
+}
+const expanded = (acc) => !!(acc.item && one(".accordion-item-content-expanded", acc.item));
+
+function collect(accordions) {
+  const creator = one(".art-object-page-content-creator-info")
+    || one(".inline-list__item:nth-child(2)");
+  const exhibitions = accordions["Tentoonstellingen"];
+  const literature = accordions["Literatuur"];
+  const literatureContent = literature && literature.item
+    ? one(".accordion-item-content-expanded", literature.item) : null;
+  return {
+    title: text(one(".art-object-page-content-title")),
+    creator_info: creator ? creator.innerText : null,
+    technique: text(xpath(
+      "//dt[contains(., 'Technique') or contains(., 'technique')]/following-sibling::dd[1]"
+    )),
+    dimensions: text(xpath(
+      "//dt[contains(., 'Dimensions') or contains(., 'dimensions')]/following-sibling::dd[1]"
+    )),
+    provenance: text(xpath(
+      "//h5[contains(text(), 'Herkomst') or contains(text(), 'Provenance')]/following-sibling::p"
+    )),
+    exhibitions: exhibitions && exhibitions.item
+      ? all(".accordion-item-content-expanded .markdown", exhibitions.item).map(text) : [],
+    literature: literatureContent ? all("p", literatureContent).map(text) : [],
+  };
+}
+
+function finish(accordions) {
+  const pending = Object.values(accordions).filter((acc) => acc.button && !expanded(acc));
+  if (pending.length && Date.now() < deadline) {
+    setTimeout(() => finish(accordions), 50);
+    return;
+  }
+  done(collect(accordions));
+}
+
+(function start() {
+  if (!one(".art-object-page-content-title")) {
+    if (Date.now() < deadline) {
+      setTimeout(start, 50);
+    } else {
+      done(null);
+    }
+    return;
+  }
+  const accordions = {};
+  for (const title of accordionTitles) {
+    const acc = accordion(title);
+    if (!acc) continue;
+    accordions[title] = acc;
+    if (acc.button && !expanded(acc)) acc.button.click();
+  }
+  finish(accordions);
+})();
+"""
+
+
+# Номер объекта музея (s0001V1962) и путь детальной страницы с ним
+OBJECT_NUMBER_RE = re.compile(r"^[a-z]\d{4}[a-z]\d{4}[a-z]*$", re.IGNORECASE)
+DETAIL_PATH_RE = re.compile(r"/collectie/([a-z]\d{4}[a-z]\d{4}[a-z]*)", re.IGNORECASE)
+IMAGE_URL_RE = re.compile(r"^https?://\S+(\.(jpe?g|png|webp)\b|/iiif/)", re.IGNORECASE)
+
+
+def is_detail_value(value):
+    return bool(DETAIL_PATH_RE.search(value) or OBJECT_NUMBER_RE.match(value))
+
+
+def to_detail_url(value):
+    """Переводит путь или номер объекта из API в URL детальной страницы."""
+    match = DETAIL_PATH_RE.search(value)
+    return f"{base_url}/{match.group(1) if match else value}"
+
+
+def painting_key(detail_url):
+    """Стабильный ключ картины: vgm-<номер объекта>, а если его нет в URL - хэш URL."""
+    match = DETAIL_PATH_RE.search(detail_url)
+    if match:
+        return f"vgm-{match.group(1)}"
+    return url_key(detail_url, "vgm")
+
+
+def links_from_json(data):
+    """Пары "URL изображения -> URL детальной страницы" из ответа API коллекции."""
+    return find_links(data, is_detail_value, IMAGE_URL_RE.match, to_detail_url)
+
+
+def add_links(known_links, pairs, links_writer, max_images):
+    """Дописывает новые ссылки в known_links и links_jsonl. Возвращает число новых."""
+    known_details = set(known_links.values())
+    added = 0
+    for image_url, detail_url in pairs.items():
+        if len(known_links) >= max_images:
+            break
+        if not new_links([image_url], known_links) or detail_url in known_details:
+            continue
+        known_details.add(detail_url)
+        known_links[image_url] = detail_url
+        links_writer.write({"image_url": image_url, "detail_url": detail_url})
+        added += 1
+    return added
+
+
+def discover_links_api(first_url, known_links, max_images):
+    """
+    Этап 1 без браузера: постранично запрашивает JSON API коллекции начиная с first_url.
+    Возвращает True, если API пройден до пустой страницы или до лимита.
+    """
+    url = first_url
+    with JsonLinesWriter(links_jsonl, mode="a") as links_writer:
+        while url and len(known_links) < max_images:
+            data = fetch_json(url)
+            if data is None:
+                return False
+            pairs = links_from_json(data)
+            added = add_links(known_links, pairs, links_writer, max_images)
+            print(f"{url}: картин в ответе {len(pairs)}, новых {added}")
+            if not pairs:
+                return True
+            url = next_page_url(url, len(pairs))
+            if url is None:
+                print("В адресе API нет номера страницы, постраничный обход невозможен.")
+                return False
+    return True
+
+
+def discover_links_capture(known_links, max_images):
+    """
+    Этап 1 через сетевые ответы: открывает коллекцию, один раз прокручивает её,
+    чтобы сайт запросил следующую порцию, и забирает ссылки из JSON-ответов.
+    Затем продолжает по HTTP с адреса последнего такого ответа, а если в нём
+    нет пагинации - прокруткой. Возвращает True, если коллекция пройдена.
+    """
+    driver = create_driver(headless=True, implicit_wait=0, blocking=discovery_blocking, capture_network=True)
     try:
-        # Ожидаем, пока элемент станет видимым
-        WebDriverWait(driver, timeout).until(
-            EC.visibility_of(element)
+        capture = NetworkCapture(driver)
+        driver.get(base_url)
+        wait_until(
+            driver,
+            EC.presence_of_element_located((By.CLASS_NAME, "collection-art-object-item-image")),
+            30,
+            "collection_grid",
         )
-        # Прокручиваем до элемента
-        ActionChains(driver).move_to_element(element).perform()
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        wait_for_network_idle(driver, idle_ms=500, timeout=scroll_timeout, name="capture_network_idle")
 
-        # Ожидаем, пока элемент станет кликабельным
-        clickable_element = WebDriverWait(driver, timeout).until(
-            EC.element_to_be_clickable(element)
-        )
-        # Пытаемся кликнуть по элементу
-        clickable_element.click()
-    except ElementClickInterceptedException:
-        # Если клик был перехвачен, ждем немного и пробуем снова
-        print("Клик по элементу перехвачен, ждем и пробуем еще раз...")
-        time.sleep(2)
-        # Используем JavaScript для клика
-        driver.execute_script("arguments[0].click();", element)
-    except TimeoutException:
-        print(f"Элемент не стал кликабельным после {timeout} секунд")
-
-try:
-    driver.get(base_url)
-    print(f"Обрабатывается страница: {base_url}")
+        endpoint = None
+        with JsonLinesWriter(links_jsonl, mode="a") as links_writer:
+            for url, data in capture.json_responses():
+                pairs = links_from_json(data)
+                if pairs:
+                    added = add_links(known_links, pairs, links_writer, max_images)
+                    print(f"Перехвачен ответ {url}: картин {len(pairs)}, новых {added}")
+                    endpoint = (url, len(pairs))
 
-    last_height = driver.execute_script("return document.body.scrollHeight")
-    processed_links = set()
-    new_links_found = True
-    page_load_attempts = 0
+        if len(known_links) >= max_images:
+            return True
+        next_url = next_page_url(*endpoint) if endpoint else None
+        if next_url:
+            return discover_links_api(next_url, known_links, max_images)
 
-    while image_id <= max_images and new_links_found:
-        page_load_attempts += 1
-        print(f'Попытка загрузки страницы: {page_load_attempts}')
+        print("API коллекции не найден в сетевых ответах, продолжаем прокруткой.")
+        return discover_links(driver, known_links, max_images)
+    finally:
+        driver.quit()
 
-        # Ожидание загрузки страницы - изменено время ожидания на 30 секунд
-        try:
-            WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "collection-art-object-item-image"))
-            )
-        except TimeoutException:
-            print(
-                f"Превышено время ожидания загрузки элементов на странице {base_url}. Попытка перезагрузки страницы."
-            )
-            driver.refresh() # Перезагружаем страницу
-            continue
 
-        # Поиск всех элементов с изображениями
-        image_elements = driver.find_elements(
-            By.CLASS_NAME, "collection-art-object-item-image"
-        )
-        print(f"Найдено {len(image_elements)} элементов с изображениями.")
+def load_links():
+    """Загружает ссылки, найденные в прошлых запусках: {URL изображения: URL детальной страницы}."""
+    return {entry["image_url"]: entry["detail_url"] for entry in iter_jsonl(links_jsonl)}
 
-        links = []
-        for image_element in image_elements:
-            link = (
-                image_element.get_attribute("data-src")
-                or image_element.get_attribute("src")
-            )
-            if (
-                link
-                and link
-                != "https://www.vangoghmuseum.nl/nl/collectie/default.jpg"
-                and link not in processed_links
-            ):
-                links.append(link)
 
-        # Проверка, были ли найдены новые ссылки
-        new_links_found = len(links) > 0
-        print(f"Найдено {len(links)} новых ссылок.")
+def discover_links(driver, known_links, max_images):
+    """
+    Этап 1: один раз прокручивает коллекцию и сохраняет ссылки на детальные страницы.
+    Найденные ссылки дописываются в links_jsonl и в known_links.
+    Возвращает True, если коллекция пройдена до конца или до лимита.
+    """
+    driver.get(base_url)
+    print(f"Обрабатывается страница: {base_url}")
 
-        i = 0
-        while i < len(links):
-            if image_id > max_images:
+    last_height = driver.execute_script("return document.body.scrollHeight")
+    page_load_attempts = 0
+    # Картина могла быть найдена другим способом (через API) под другим URL изображения
+    known_details = set(known_links.values())
+
+    with JsonLinesWriter(links_jsonl, mode="a") as links_writer:
+        while len(known_links) < max_images:
+            page_load_attempts += 1
+            print(f'Попытка загрузки страницы: {page_load_attempts}')
+
+            # Ожидание загрузки страницы - изменено время ожидания на 30 секунд
+            if not wait_until(
+                driver,
+                EC.presence_of_element_located((By.CLASS_NAME, "collection-art-object-item-image")),
+                30,
+                "collection_grid",
+            ):
                 print(
-                    f"Достигнут лимит в {max_images} изображений. Завершаем обработку."
+                    f"Превышено время ожидания загрузки элементов на странице {base_url}. Попытка перезагрузки страницы."
                 )
-                break
-
-            link = links[i]
-            processed_links.add(link)
-            print(f"Обрабатывается изображение {image_id} из {max_images}: {link}")
-
-            try:
-                # Получаем ссылку на страницу с картиной
-                all_links = driver.find_elements(By.TAG_NAME, "a")
-                detail_page_link = None
-                for a_link in all_links:
-                    try:
-                        img = a_link.find_element(By.TAG_NAME, "img")
-                        img_src = (
-                            img.get_attribute("data-src")
-                            or img.get_attribute("src")
-                        )
-                        if img_src == link:
-                            detail_page_link = a_link.get_attribute("href")
-                            break
-                    except NoSuchElementException:
-                        continue
+                driver.refresh() # Перезагружаем страницу
+                continue
+
+            # Сетка и индекс ссылок на детальные страницы строятся один раз на шаг прокрутки
+            image_urls, detail_index = read_grid(driver)
+            links = new_links(image_urls, known_links)
+            print(f"Найдено {len(image_urls)} элементов с изображениями, из них {len(links)} новых.")
 
+            for link in links:
+                detail_page_link = detail_index.get(link)
                 if not detail_page_link:
                     print(
                         f"Не найдена ссылка на страницу с деталями для изображения {link}"
                     )
-                    i += 1
                     continue
+                if detail_page_link in known_details:
+                    continue
+                known_details.add(detail_page_link)
+                known_links[link] = detail_page_link
+                links_writer.write({"image_url": link, "detail_url": detail_page_link})
+                if len(known_links) >= max_images:
+                    print(f"Достигнут лимит в {max_images} изображений.")
+                    return True
+
+            # Прокрутка вниз для загрузки новых элементов
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            # Вместо фиксированной паузы ждём появления новых картин в сетке
+            # (не дольше scroll_timeout), а затем окончания изменений DOM
+            grew = wait_for_new_items(
+                driver, ".collection-art-object-item-image", len(image_urls), scroll_timeout, "scroll_new_items"
+            )
+            if grew:
+                wait_for_dom_quiet(driver, quiet_ms=300, timeout=2, name="scroll_settle")
+            else:
+                # Новых картин нет: перед проверкой конца страницы дожидаемся тишины в сети
+                wait_for_network_idle(driver, idle_ms=500, timeout=5, name="scroll_network_idle")
+            # Конец коллекции - только если сетка не выросла и страница не удлинилась.
+            # Экран без новых ссылок концом не считается: при продолжении обхода
+            # первые экраны состоят из уже известных картин.
+            new_height = driver.execute_script("return document.body.scrollHeight")
+            if not grew and new_height == last_height:
+                print("Достигнут конец страницы, выходим из цикла.")
+                return True
+            last_height = new_height
+
+    return True
+
+
+def scrape_details(driver, detail_url, link):
+    """
+    Этап 2: собирает данные о картине со страницы detail_url.
+    Возвращает словарь без ID или None, если не найдена информация об авторе.
 
-                driver.get(detail_page_link)
+    При detail_extractor = "js" вкладки раскрываются и поля извлекаются одним
+    скриптом; если он не сработал, страница разбирается пошагово через WebDriver.
+    """
+    # Темп загрузки страниц музея регулирует общий governor
+    with governor.slot(detail_url), metrics.timed("driver_get"):
+        driver.get(detail_url)
+    measure_page(driver)
 
-                # Ожидание загрузки нужных элементов
-                WebDriverWait(driver, 30).until(
-                    EC.presence_of_element_located(
-                        (
-                            By.CSS_SELECTOR,
-                            ".art-object-page-content-title, .art-object-page-content-creator-info, .inline-list__item, .art-object-page-content-details, .definition-list-item-value",
-                        )
-                    )
+    if detail_extractor == "js":
+        try:
+            driver.set_script_timeout(detail_timeout + 5)
+            with metrics.timed("accordion_extract_js"):
+                data = driver.execute_async_script(
+                    VANGOGH_EXTRACT_SCRIPT, VANGOGH_ACCORDIONS, detail_timeout * 1000
                 )
+        except (JavascriptException, TimeoutException) as e:
+            print(f"Скрипт извлечения не сработал для изображения {link}: {e}")
+            data = None
+
+        if data is not None:
+            if archive is not None:
+                archive.store(detail_url, page_source(driver), "browser")
+            if data["creator_info"] is None:
+                print(
+                    f"Не удалось найти информацию об авторе для изображения {link}"
+                )
+                return None
+            return make_record(link, data["title"], data["creator_info"], data["technique"],
+                               data["dimensions"], data["provenance"], data["exhibitions"], data["literature"])
+
+    return scrape_details_stepwise(driver, link)
+
+
+def make_record(link, title, creator_info_text, technique, dimensions_text, provenance, exhibitions, literature):
+    """Собирает запись о картине из извлечённых со страницы значений."""
+    # Получение и обработка информации об авторе
+    artist_name = creator_info_text.split(",")[0].strip()
+    # Получение и обработка даты
+    date_parts = creator_info_text.split(",")
+    if len(date_parts) > 1:
+        date = date_parts[-1].strip()
+    else:
+        date = ""
+
+    # Ищем только числа и "cm"
+    dimensions = None
+    if dimensions_text:
+        dimensions_match = re.search(
+            r"(\d+(?:\.\d+)?\s*cm\s*×\s*\d+(?:\.\d+)?\s*cm)",
+            dimensions_text
+        )
+        if dimensions_match:
+            dimensions = dimensions_match.group(1).strip()
+
+    return {
+        "image_url": link,
+        "title": title,
+        "date": date,
+        "name_of_artist": artist_name,
+        "technique": technique, # Изменено
+        "dimensions": dimensions, # Изменено
+        "signature": None,
+        "location": "Van Gogh Museum, Amsterdam",
+        "exhibitions": exhibitions,
+        "provenance": provenance, # Изменено
+        "literature": literature
+    }
+
+
+# Декларативная спецификация тех же полей, что возвращает VANGOGH_EXTRACT_SCRIPT,
+# для разбора сохранённого HTML (правила см. field_spec.FieldExtractor)
+VANGOGH_FIELDS = {
+    "title": {"select": ".art-object-page-content-title"},
+    "creator_info": {"select": ".art-object-page-content-creator-info"},
+    "creator_fallback": {"select": "ul.inline-list li.inline-list__item", "index": 1},
+    "technique": {"select": "dt", "contains": ("Technique", "technique"), "next": "dd"},
+    "dimensions": {"select": "dt", "contains": ("Dimensions", "dimensions"), "next": "dd"},
+    "provenance": {"select": "h5", "contains": ("Herkomst", "Provenance"), "next": "p"},
+    "exhibitions": {
+        "select": "div.accordion-item-content div.markdown", "many": True,
+        "section": ("div.accordion-item", "h4.accordion-item-button", "Tentoonstellingen"),
+    },
+    "literature": {
+        "select": "div.accordion-item-content p", "many": True,
+        "section": ("div.accordion-item", "h4.accordion-item-button", "Literatuur"),
+    },
+}
+VANGOGH_EXTRACTOR = compile_spec(VANGOGH_FIELDS)
+
+
+def parse_details(html, link):
+    """Собирает запись о картине из HTML детальной страницы (например, из архива
+    снимков) по VANGOGH_FIELDS. Возвращает None, если нет информации об авторе."""
+    with metrics.timed("html_parse"):
+        data = VANGOGH_EXTRACTOR.extract(html)
+    creator_info = data["creator_info"] or data["creator_fallback"]
+    if creator_info is None:
+        return None
+    return make_record(link, data["title"], creator_info, data["technique"],
+                       data["dimensions"], data["provenance"], data["exhibitions"], data["literature"])
+
+
+def scrape_details_stepwise(driver, link):
+    """
+    Пошаговый разбор уже открытой детальной страницы через WebDriver
+    (клики по вкладкам и поиск элементов по одному).
+    """
+    # Ожидание загрузки нужных элементов
+    WebDriverWait(driver, 30).until(
+        EC.presence_of_element_located(
+            (
+                By.CSS_SELECTOR,
+                ".art-object-page-content-title, .art-object-page-content-creator-info, .inline-list__item, .art-object-page-content-details, .definition-list-item-value",
+            )
+        )
+    )
 
-                # Получение заголовка
-                title = driver.find_element(
-                    By.CLASS_NAME, "art-object-page-content-title"
-                ).text
+    # Получение заголовка
+    title = driver.find_element(
+        By.CLASS_NAME, "art-object-page-content-title"
+    ).text
 
-                # Поиск элемента с информацией об авторе и дате
-                try:
-                    creator_info_element = driver.find_element(
-                        By.CLASS_NAME, "art-object-page-content-creator-info"
-                    )
-                except TimeoutException:
-                    try:
-                        creator_info_element = driver.find_element(
-                            By.CSS_SELECTOR, ".inline-list__item:nth-child(2)"
-                        )
-                    except TimeoutException:
-                        print(
-                            f"Не удалось найти информацию об авторе для изображения {link}"
-                        )
-                        driver.get(base_url)
-                        i += 1
-                        continue
-
-                # Получение и обработка информации об авторе
-                creator_info_text = creator_info_element.text
-                artist_name = creator_info_text.split(",")[0].strip()
-                # Получение и обработка даты
-                date_text = creator_info_element.text
-                date_parts = date_text.split(",")
-                if len(date_parts) > 1:
-                    date = date_parts[-1].strip()
-                else:
-                    date = ""
-
-                # Раздел "Objectgegevens"
-                # details = {}  <-- Удаляем эту строку
-                technique = None
-                dimensions = None
-                provenance = None
+    # Поиск элемента с информацией об авторе и дате
+    try:
+        creator_info_element = driver.find_element(
+            By.CLASS_NAME, "art-object-page-content-creator-info"
+        )
+    except NoSuchElementException:
+        try:
+            creator_info_element = driver.find_element(
+                By.CSS_SELECTOR, ".inline-list__item:nth-child(2)"
+            )
+        except NoSuchElementException:
+            print(
+                f"Не удалось найти информацию об авторе для изображения {link}"
+            )
+            return None
 
-                try:
-                    # Находим кнопку для открытия раздела "Objectgegevens"
-                    objectgegevens_button = driver.find_element(
-                        By.XPATH,
-                        "//h4[contains(@class, 'accordion-item-button') and contains(., 'Objectgegevens')]/button",
-                    )
+    creator_info_text = creator_info_element.text
 
-                    click_with_retry(driver, objectgegevens_button)
+    # Раздел "Objectgegevens"
+    # details = {}  <-- Удаляем эту строку
+    technique = None
+    dimensions_text = None
+    provenance = None
 
-                    # Ожидание загрузки содержимого раздела "Objectgegevens"
-                    WebDriverWait(driver, 20).until(
-                        EC.presence_of_element_located(
-                            (
-                                By.XPATH,
-                                "//h5[contains(text(), 'Herkomst')]/following-sibling::p",
-                            )
-                        )
-                    )
+    try:
+        # Находим кнопку для открытия раздела "Objectgegevens"
+        objectgegevens_button = driver.find_element(
+            By.XPATH,
+            "//h4[contains(@class, 'accordion-item-button') and contains(., 'Objectgegevens')]/button",
+        )
 
-                    # Извлекаем technique
-                    try:
-                        # Ищем элемент с техникой в разделе "Objectgegevens"
-                        technique_element = driver.find_element(
-                            By.XPATH,
-                            "//dt[contains(., 'Technique') or contains(., 'technique')]/following-sibling::dd[1]"
-                        )
-                        technique = technique_element.text.strip()
-
-                    except NoSuchElementException:
-                        print(
-                            f"Не удалось найти информацию о технике для изображения {link}"
-                        )
-
-                    # Извлекаем dimensions
-                    try:
-                        # Ищем элемент с размерами в разделе "Objectgegevens"
-                        dimensions_element = driver.find_element(
-                            By.XPATH,
-                            "//dt[contains(., 'Dimensions') or contains(., 'dimensions')]/following-sibling::dd[1]"
-                        )
-
-                        dimensions_text = dimensions_element.text.strip()
-
-                        # Ищем только числа и "cm"
-                        dimensions_match = re.search(
-                            r"(\d+(?:\.\d+)?\s*cm\s*×\s*\d+(?:\.\d+)?\s*cm)",
-                           dimensions_text
-                        )
-
-                        if dimensions_match:
-                            dimensions = dimensions_match.group(1).strip()
-
-                    except NoSuchElementException:
-                        print(
-                            f"Не удалось найти информацию о размерах для изображения {link}"
-                        )
-                    # Извлекаем provenance
-                    try:
-                        provenance_element = driver.find_element(
-                            By.XPATH,
-                            "//h5[contains(text(), 'Herkomst') or contains(text(), 'Provenance')]/following-sibling::p",
-                        )
-                        provenance = provenance_element.text.strip()
-
-                    except NoSuchElementException:
-                        print(
-                            f"Не удалось найти информацию о провенансе для изображения {link}"
-                        )
-
-                except (
-                    NoSuchElementException,
-                    TimeoutException,
-                    StaleElementReferenceException,
-                ) as e:
-                    print(
-                        f"Ошибка при обработке раздела 'Objectgegevens' для изображения {link}: {e}"
-                    )
+        click_with_retry(driver, objectgegevens_button)
 
-               # Обработка информации о выставках (exhibitions)
-                exhibitions = []
-                try:
-                    # Поиск кнопки для открытия раздела "Tentoonstellingen"
-                    exhibitions_button = driver.find_element(
-                        By.XPATH,
-                        "//h4[contains(@class, 'accordion-item-button') and contains(., 'Tentoonstellingen')]/button",
-                    )
+        # Ожидание загрузки содержимого раздела "Objectgegevens"
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located(
+                (
+                    By.XPATH,
+                    "//h5[contains(text(), 'Herkomst')]/following-sibling::p",
+                )
+            )
+        )
 
-                    click_with_retry(driver, exhibitions_button)
+        # Извлекаем technique
+        try:
+            # Ищем элемент с техникой в разделе "Objectgegevens"
+            technique_element = driver.find_element(
+                By.XPATH,
+                "//dt[contains(., 'Technique') or contains(., 'technique')]/following-sibling::dd[1]"
+            )
+            technique = technique_element.text.strip()
 
-                    # Ожидание загрузки содержимого раздела "Tentoonstellingen"
-                    WebDriverWait(driver, 20).until(
-                        EC.presence_of_element_located(
-                            (By.CSS_SELECTOR, ".accordion-item-content-expanded")
-                        )
-                    )
+        except NoSuchElementException:
+            print(
+                f"Не удалось найти информацию о технике для изображения {link}"
+            )
 
-                    # Поиск всех элементов с информацией о выставках в .accordion-item-content
-                    exhibition_items = driver.find_elements(
-                        By.CSS_SELECTOR, ".accordion-item-content-expanded .markdown"
-                    )
+        # Извлекаем dimensions
+        try:
+            # Ищем элемент с размерами в разделе "Objectgegevens"
+            dimensions_element = driver.find_element(
+                By.XPATH,
+                "//dt[contains(., 'Dimensions') or contains(., 'dimensions')]/following-sibling::dd[1]"
+            )
 
-                    # Извлечение и форматирование информации о выставках
-                    for item in exhibition_items:
-                        exhibitions.append(item.text.strip())
+            dimensions_text = dimensions_element.text.strip()
 
-                except (
-                    NoSuchElementException,
-                    TimeoutException,
-                    StaleElementReferenceException,
-                ) as e:
-                    print(
-                        f"Ошибка при обработке раздела 'Tentoonstellingen' для изображения {link}: {e}"
-                    )
+        except NoSuchElementException:
+            print(
+                f"Не удалось найти информацию о размерах для изображения {link}"
+            )
+        # Извлекаем provenance
+        try:
+            provenance_element = driver.find_element(
+                By.XPATH,
+                "//h5[contains(text(), 'Herkomst') or contains(text(), 'Provenance')]/following-sibling::p",
+            )
+            provenance = provenance_element.text.strip()
 
-                # Обработка информации о литературе (literature)
-                literature = []
-                try:
-                    # Поиск кнопки для открытия раздела "Literatuur"
-                    literature_button = driver.find_element(
-                        By.XPATH,
-                        "//h4[contains(@class, 'accordion-item-button') and contains(., 'Literatuur')]/button",
-                    )
-                    click_with_retry(driver, literature_button)
+        except NoSuchElementException:
+            print(
+                f"Не удалось найти информацию о провенансе для изображения {link}"
+            )
 
-                    # Ожидание загрузки содержимого раздела "Literatuur"
-                    WebDriverWait(driver, 20).until(
-                        EC.presence_of_element_located(
-                            (By.CSS_SELECTOR, ".accordion-item-content-expanded")
-                        )
-                    )
+    except (
+        NoSuchElementException,
+        TimeoutException,
+        StaleElementReferenceException,
+    ) as e:
+        print(
+            f"Ошибка при обработке раздела 'Objectgegevens' для изображения {link}: {e}"
+        )
 
-                    # Находим родительский div раздела "Literatuur"
-                    literature_parent_div = driver.find_element(
-                        By.XPATH,
-                        "//h4[contains(@class, 'accordion-item-button') and contains(., 'Literatuur')]/ancestor::div[contains(@class, 'accordion-item')]",
-                    )
+    # Обработка информации о выставках (exhibitions)
+    exhibitions = []
+    try:
+        # Поиск кнопки для открытия раздела "Tentoonstellingen"
+        exhibitions_button = driver.find_element(
+            By.XPATH,
+            "//h4[contains(@class, 'accordion-item-button') and contains(., 'Tentoonstellingen')]/button",
+        )
 
-                    # Извлечение информации о литературе
-                    literature_content = literature_parent_div.find_element(
-                        By.CSS_SELECTOR, ".accordion-item-content-expanded"
-                    )
+        click_with_retry(driver, exhibitions_button)
 
-                    if literature_content:
-                        # Находим все <p> теги в содержимом раздела "Literatuur"
-                        p_tags = literature_content.find_elements(By.TAG_NAME, "p")
-                        for p in p_tags:
-                            literature.append(p.text.strip())
-
-                except (
-                    NoSuchElementException,
-                    TimeoutException,
-                    StaleElementReferenceException,
-                ) as e:
-                    print(
-                        f"Ошибка при обработке раздела 'Literatuur' для изображения {link}: {e}"
-                    )
+        # Ожидание загрузки содержимого раздела "Tentoonstellingen"
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located(
+                (By.CSS_SELECTOR, ".accordion-item-content-expanded")
+            )
+        )
 
-                image_data.append(
-                    {
-                        "id": image_id,
-                        "image_url": link,
-                        "title": title,
-                        "date": date,
-                        "name_of_artist": artist_name,
-                        "technique": technique, # Изменено
-                        "dimensions": dimensions, # Изменено
-                        "signature": None,
-                        "location": "Van Gogh Museum, Amsterdam",
-                        "exhibitions": exhibitions,
-                        "provenance": provenance, # Изменено
-                        "literature": literature
-                    }
-                )
-                print(
-                    f"Собран заголовок: {title}, изображение: {link}, дата: {date}, художник: {artist_name}, техника: {technique}, размеры: {dimensions}, подпись: {None}, местонахождение: Van Gogh Museum, Amsterdam, выставки: {exhibitions}, провенанс: {provenance}, литература: {literature}"
-                )
+        # Поиск всех элементов с информацией о выставках в .accordion-item-content
+        exhibition_items = driver.find_elements(
+            By.CSS_SELECTOR, ".accordion-item-content-expanded .markdown"
+        )
+
+        # Извлечение и форматирование информации о выставках
+        for item in exhibition_items:
+            exhibitions.append(item.text.strip())
+
+    except (
+        NoSuchElementException,
+        TimeoutException,
+        StaleElementReferenceException,
+    ) as e:
+        print(
+            f"Ошибка при обработке раздела 'Tentoonstellingen' для изображения {link}: {e}"
+        )
 
-                image_id += 1
-                i += 1
+    # Обработка информации о литературе (literature)
+    literature = []
+    try:
+        # Поиск кнопки для открытия раздела "Literatuur"
+        literature_button = driver.find_element(
+            By.XPATH,
+            "//h4[contains(@class, 'accordion-item-button') and contains(., 'Literatuur')]/button",
+        )
+        click_with_retry(driver, literature_button)
 
-            except Exception as e:
-                print(f"Непредвиденная ошибка: {e}")
-            finally:
-                # Возвращаемся к базовому URL после обработки каждой картины
-                driver.get(base_url)
+        # Ожидание загрузки содержимого раздела "Literatuur"
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located(
+                (By.CSS_SELECTOR, ".accordion-item-content-expanded")
+            )
+        )
 
-                # Ожидаем загрузку элементов на главной странице
-                WebDriverWait(driver, 30).until(
-                    EC.presence_of_element_located(
-                        (By.CLASS_NAME, "collection-art-object-item-image")
-                    )
-                )
+        # Находим родительский div раздела "Literatuur"
+        literature_parent_div = driver.find_element(
+            By.XPATH,
+            "//h4[contains(@class, 'accordion-item-button') and contains(., 'Literatuur')]/ancestor::div[contains(@class, 'accordion-item')]",
+        )
 
-                # Обновляем список ссылок после возвращения на главную страницу
-                image_elements = driver.find_elements(
-                    By.CLASS_NAME, "collection-art-object-item-image"
-                )
-                print(
-                    f"После возврата на главную страницу найдено {len(image_elements)} элементов с изображениями."
-                )
-                links = []
-                for image_element in image_elements:
-                    link = (
-                        image_element.get_attribute("data-src")
-                        or image_element.get_attribute("src")
-                    )
-                    if (
-                        link
-                        and link
-                        != "https://www.vangoghmuseum.nl/nl/collectie/default.jpg"
-                        and link not in processed_links
-                    ):
-                        links.append(link)
-                print(
-                    f"После возврата на главную страницу найдено {len(links)} новых ссылок."
-                )
+        # Извлечение информации о литературе
+        literature_content = literature_parent_div.find_element(
+            By.CSS_SELECTOR, ".accordion-item-content-expanded"
+        )
 
-        # Прокрутка вниз для загрузки новых элементов
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(5)  # Увеличил паузу до 5 секунд
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
-            print("Достигнут конец страницы, выходим из цикла.")
-            break
-        last_height = new_height
+        if literature_content:
+            # Находим все <p> теги в содержимом раздела "Literatuur"
+            p_tags = literature_content.find_elements(By.TAG_NAME, "p")
+            for p in p_tags:
+                literature.append(p.text.strip())
+
+    except (
+        NoSuchElementException,
+        TimeoutException,
+        StaleElementReferenceException,
+    ) as e:
+        print(
+            f"Ошибка при обработке раздела 'Literatuur' для изображения {link}: {e}"
+        )
 
-        if image_id > max_images:
-            print(f"Достигнут лимит в {max_images} изображений (заголовков).")
-            break
 
-        if not new_links_found:
-            print("Новых ссылок не найдено, выходим из цикла.")
-            break
+    if archive is not None:
+        archive.store(driver.current_url, page_source(driver), "browser")
+    return make_record(link, title, creator_info_text, technique, dimensions_text,
+                       provenance, exhibitions, literature)
+
+
+def process_link(driver_pool, state, writer, position, link, detail_url):
+    """
+    Обрабатывает одну картину драйвером из пула и записывает результат
+    с ключом painting_key и номером в порядке обнаружения `position`.
+    Ошибки браузера повторяются до retry_attempts раз (каждый раз с драйвером
+    из пула); если страница так и не обработана, картина попадает в список
+    "мёртвых писем".
+    """
+    state.mark_started(link)
+
+    def attempt():
+        with driver_pool.driver() as driver:
+            return scrape_details(driver, detail_url, link)
+
+    try:
+        record = retry_call(
+            attempt,
+            detail_url,
+            retry_if=lambda e: isinstance(e, WebDriverException),
+            attempts=retry_attempts,
+            base_delay=retry_base_delay,
+        )
+    except Exception as e:
+        print(f"Непредвиденная ошибка для изображения {link}: {e}")
+        state.mark_dead(link, e)
+        return False
 
-except Exception as e:
-    print(f"Произошла ошибка: {e}")
+    if record is None:
+        state.mark_failed(link, "creator info not found")
+        return False
 
-finally:
-    driver.quit()
+    writer.write({"key": painting_key(detail_url), **record, "listing_position": position})
+    state.mark_done(link, output_jsonl)
+    print(
+        f"Собран заголовок: {record['title']}, изображение: {link}, дата: {record['date']}, художник: {record['name_of_artist']}, техника: {record['technique']}, размеры: {record['dimensions']}, подпись: {None}, местонахождение: Van Gogh Museum, Amsterdam, выставки: {record['exhibitions']}, провенанс: {record['provenance']}, литература: {record['literature']}"
+    )
+    return True
 
-# Сохранение данных в JSON файл
-with open("vangogh_images_test.json", "w", encoding="utf-8") as f:
-    json.dump(image_data, f, indent=4, ensure_ascii=False)
-print(f"Собрано данных: {len(image_data)}")
-print("Данные сохранены в файл vangogh_images_test.json")
\ No newline at end of file
+
+def fetch_details(known_links, state, writer, retry_dead=False):
+    """
+    Этап 2: параллельно обходит детальные страницы всех найденных картин,
+    кроме уже обработанных в прошлых запусках и "мёртвых писем"
+    (их обрабатывает только запуск с retry_dead).
+    """
+    skipped = (CrawlState.DONE,) if retry_dead else (CrawlState.DONE, CrawlState.DEAD)
+    pending = [
+        (position, link, detail_url)
+        for position, (link, detail_url) in enumerate(known_links.items())
+        if state.status(link) not in skipped
+    ]
+    print(f"Детальных страниц к обработке: {len(pending)} (потоков: {max_workers})")
+
+    governor.configure(initial=min(governor_initial, max_workers), maximum=max_workers)
+    breakers.configure(failure_threshold=breaker_threshold, reset_timeout=breaker_reset)
+    driver_pool = DriverPool(size=max_workers, implicit_wait=0, blocking=detail_blocking)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [
+            executor.submit(process_link, driver_pool, state, writer, position, link, detail_url)
+            for position, link, detail_url in pending
+        ]
+        processed = 0
+        for future in as_completed(futures):
+            if future.result():
+                processed += 1
+            if processed and processed % 50 == 0:
+                print(f"Обработано {processed} из {len(pending)} картин")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        driver_pool.close()
+
+
+def main(retry_dead=False):
+    """
+    Запускает оба этапа. С retry_dead заново обрабатываются и картины,
+    которые в прошлых запусках не удались после всех повторов.
+    """
+    # Создание папки для загрузки изображений
+    if not os.path.exists(download_folder):
+        os.makedirs(download_folder)
+
+    global archive
+    state = CrawlState(state_db)
+    exporter = MetricsExporter(metrics_file, metrics_interval, metrics_port)
+    archive = SnapshotArchive(snapshot_dir) if snapshot_dir else None
+    # Каждая запись сразу дописывается в JSON Lines, чтобы падение не теряло собранное
+    writer = JsonLinesWriter(output_jsonl, mode="a")
+    known_links = load_links()
+
+    try:
+        if state.get_meta("discovery_complete") == "1":
+            print(f"Ссылки уже собраны ({len(known_links)}), этап обхода коллекции пропущен.")
+        else:
+            if discovery_mode == "api":
+                complete = discover_links_api(api_url, known_links, max_images)
+            elif discovery_mode == "capture":
+                complete = discover_links_capture(known_links, max_images)
+            else:
+                driver = create_driver(headless=True, implicit_wait=0, blocking=discovery_blocking)
+                try:
+                    complete = discover_links(driver, known_links, max_images)
+                finally:
+                    driver.quit()
+            if complete:
+                state.set_meta("discovery_complete", "1")
+            print(f"Найдено ссылок на детальные страницы: {len(known_links)}")
+
+        fetch_details(known_links, state, writer, retry_dead)
+
+    except Exception as e:
+        print(f"Произошла ошибка: {e}")
+
+    finally:
+        writer.close()
+        print(f"Состояние обхода: {state.counts()}")
+        dead_letters = state.dead_letters()
+        if dead_letters:
+            print(f"Не обработано после всех повторов: {len(dead_letters)} (запустите с аргументом retry-dead)")
+        print(f"Ожидания (секунды): {wait_stats.summary()}")
+        print(f"Лимиты запросов по хостам: {governor.summary()}")
+        print(f"Загрузка страниц в браузере: {resource_report.summary()}")
+        exporter.close()
+        print(f"Метрики этапов сохранены в {metrics_file}")
+        if archive is not None:
+            archive.close()
+        state.close()
+
+    # Сборка JSON Lines в JSON-массив прежнего формата
+    # Записи прошлых версий без ключа и позиции идут первыми в порядке старых ID
+    count = export_json_array(
+        output_jsonl,
+        output_json,
+        sort_key=lambda r: (r.get("listing_position", -1), r.get("id", 0)),
+        unique_key=lambda r: r.get("key", r.get("id")),
+        alias=export_alias,
+    )
+    print(f"Собрано данных: {count}")
+    print(f"Данные сохранены в файл {output_json}")
+
+
+if __name__ == "__main__":
+    main(retry_dead="retry-dead" in sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,363 @@
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.common.exceptions import WebDriverException
+
+from fixture_server import FixtureSite, add_fault_arguments, faults_from_args, start_server
+from metrics import metrics
+from retry import breakers
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class StageTimer:
+    """Длительность каждой страницы по этапам, общее время этапа и число ошибок."""
+
+    def __init__(self):
+        self.samples = {}
+        self.wall = {}
+        self.errors = {}
+
+    def run(self, stage, items, func, workers=1):
+        """Вызывает func(item) для каждого элемента и записывает длительности.
+
+        Исключение в func считается ошибкой страницы (результат - None),
+        этап продолжается.
+        """
+        samples = self.samples.setdefault(stage, [])
+        self.errors.setdefault(stage, 0)
+
+        def timed(item):
+            started = time.perf_counter()
+            try:
+                return func(item)
+            except Exception:
+                self.errors[stage] += 1
+                return None
+            finally:
+                samples.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        try:
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    return list(executor.map(timed, items))
+            return [timed(item) for item in items]
+        finally:
+            self.wall[stage] = self.wall.get(stage, 0.0) + time.perf_counter() - started
+
+    def record(self, stage, seconds):
+        """Записывает один замер, сделанный вне run()."""
+        self.samples.setdefault(stage, []).append(seconds)
+        self.wall[stage] = self.wall.get(stage, 0.0) + seconds
+        self.errors.setdefault(stage, 0)
+
+    def report(self):
+        report = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            report[stage] = {
+                "pages": len(samples),
+                "pages_per_sec": round(len(samples) / self.wall[stage], 2) if self.wall[stage] else None,
+                "p50_ms": round(statistics.median(ordered) * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                "errors": self.errors[stage],
+            }
+        return report
+
+
+def peak_rss_mb():
+    """Пиковый RSS процесса и завершившихся дочерних процессов (Chrome, chromedriver)."""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def load_vangogh():
+    """Импортирует 10.py (имя модуля начинается с цифры)."""
+    spec = importlib.util.spec_from_file_location("vangogh", os.path.join(ROOT, "10.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_nga_http(timer, high, session, site, workers):
+    """Список и детальные страницы NGA без браузера. Детальные страницы
+    повторяются так же, как при обходе (high.retry_detail): ошибкой этапа
+    считается страница, которая при обходе попала бы в "мёртвые письма"."""
+
+    def listing(page):
+        html = high.fetch_html(high.highlights_page_url(page), session)
+        if html is None:
+            raise RuntimeError(f"Страница списка {page} не загрузилась")
+        return high.parse_nga_highlights(html)
+
+    def details(url):
+        return high.retry_detail(lambda: high.scrape_artwork_details(url, mode="http", session=session), url)
+
+    pages = range(1, (site.nga_items - 1) // site.nga_page_size + 2)
+    listings = timer.run("nga_listing_http", pages, listing)
+    urls = [item["link_to_the_page_of_the_work"] for listing in listings for item in listing or []]
+    timer.run("nga_details_http", urls, details, workers)
+    return listings
+
+
+def bench_images(timer, download_image, listings, session, folder, workers):
+    images = [item["image_url"] for listing in listings for item in listing or []]
+    timer.run(
+        "image_download",
+        list(enumerate(images)),
+        lambda pair: download_image(pair[1], folder, f"{pair[0]}.jpg", session),
+        workers,
+    )
+
+
+def bench_extractors(timer, high, session, site, skipped):
+    """Разбор уже скачанных детальных страниц в одном потоке: BeautifulSoup
+    с обоими парсерами против скомпилированной спецификации (NGA_FIELDS,
+    VANGOGH_FIELDS). Записи NGA, которые расходятся с BeautifulSoup, выводятся.
+
+    Страницы скачиваются через high.fetch_html с повторами; страницы, которые
+    так и не загрузились из-за внесённых сбоев, в замер не попадают.
+    Без lxml варианты с ним пропускаются и записываются в `skipped`.
+    """
+    from bs4.builder import builder_registry
+    import nga_parser
+
+    nga_pages = [html for html in (high.fetch_html(url, session) for url in site.nga_detail_urls()) if html]
+    has_lxml = builder_registry.lookup("lxml") is not None
+    variants = [("html.parser", "soup"), ("lxml", "soup"), ("lxml", "spec")]
+    if not has_lxml:
+        variants = variants[:1]
+        skipped.append("извлечение с lxml (extract_nga_soup_lxml, extract_nga_spec, extract_vangogh_spec): нет пакета lxml")
+    records = {}
+    for parser, extractor in variants:
+        nga_parser.set_parser(parser, extractor)
+        name = "extract_nga_spec" if extractor == "spec" else f"extract_nga_soup_{parser.replace('.', '_')}"
+        records[name] = timer.run(name, nga_pages, nga_parser.parse_detail_page)
+    if "extract_nga_spec" in records:
+        differences = sum(
+            1 for expected, actual in zip(records["extract_nga_soup_html_parser"], records["extract_nga_spec"])
+            if expected != actual
+        )
+        print(f"  спецификация расходится с BeautifulSoup на {differences} из {len(nga_pages)} страниц NGA")
+
+    if not has_lxml:
+        return
+    vangogh = load_vangogh()
+    vangogh_pages = [
+        html for html in (
+            high.fetch_html(f"{vangogh.base_url}/{site.vangogh_code(index)}", session)
+            for index in range(site.vangogh_items)
+        )
+        if html
+    ]
+    timer.run("extract_vangogh_spec", vangogh_pages, lambda html: vangogh.parse_details(html, None))
+
+
+def bench_nga_browser(timer, high, driver_pool, session, site, workers, folder):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from waits import wait_until
+
+    def listing(page):
+        with driver_pool.driver() as driver:
+            driver.get(high.highlights_page_url(page))
+            wait_until(driver, EC.presence_of_element_located((By.CSS_SELECTOR, "ul.returns")), 10, "bench_listing")
+            return high.scrape_nga_highlights(driver)
+
+    timer.run("nga_listing_browser", range(1, (site.nga_items - 1) // site.nga_page_size + 2), listing)
+    timer.run(
+        "nga_details_browser",
+        site.nga_detail_urls(),
+        lambda url: high.scrape_artwork_details(url, driver_pool, mode="browser"),
+        workers,
+    )
+
+    def scrape_page(page):
+        with driver_pool.driver() as driver:
+            driver.get(high.highlights_page_url(page))
+            return high.scrape_page(driver, page, folder, workers, driver_pool, session)
+
+    # Страница целиком: список, детальные страницы и изображения, как в high.scrape_page
+    timer.run("nga_scrape_page", range(1, (site.nga_items - 1) // site.nga_page_size + 2), scrape_page)
+
+
+def bench_vangogh(timer, vangogh, driver_pool, site, workers, folder):
+    from browser import create_driver
+
+    vangogh.links_jsonl = os.path.join(folder, "vangogh_links.jsonl")
+    for mode in ("scroll", "capture"):
+        known_links = {}
+
+        def discover(_):
+            if mode == "capture":
+                return vangogh.discover_links_capture(known_links, site.vangogh_items)
+            driver = create_driver(headless=True, implicit_wait=0, blocking=vangogh.discovery_blocking)
+            try:
+                return vangogh.discover_links(driver, known_links, site.vangogh_items)
+            finally:
+                driver.quit()
+
+        timer.run(f"vangogh_discovery_{mode}", [None], discover)
+        print(f"  {mode}: найдено {len(known_links)} из {site.vangogh_items} ссылок")
+
+    def details(pair):
+        link, detail_url = pair
+        with driver_pool.driver() as driver:
+            return vangogh.scrape_details(driver, detail_url, link)
+
+    timer.run("vangogh_details_browser", list(known_links.items()), details, workers)
+
+
+def compare(report, baseline_path):
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = json.load(file)
+    print(f"\nСравнение с {baseline_path}:")
+    for stage, row in report["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if not old or not old.get("pages_per_sec") or not row["pages_per_sec"]:
+            continue
+        print(
+            f"  {stage:28} {row['pages_per_sec'] / old['pages_per_sec']:.2f}x страниц/с, "
+            f"p95 {old['p95_ms']} -> {row['p95_ms']} мс"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Замер скорости скраперов на локальных фикстурах (fixture_server.py). "
+                    "Этапы, которым нужен Chrome, пропускаются, если драйвер не запускается."
+    )
+    parser.add_argument("--nga-items", type=int, default=60)
+    parser.add_argument("--vangogh-items", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--no-browser", action="store_true", help="только этапы без Chrome")
+    parser.add_argument("--parser", default="html.parser", help="парсер HTML: html.parser или lxml")
+    parser.add_argument("--extractor", default="soup", help="извлечение полей: soup или spec")
+    parser.add_argument(
+        "--parse-workers", type=int, default=None,
+        help="процессы разбора детальных страниц (по умолчанию по числу ядер, 0 - в потоках)",
+    )
+    parser.add_argument(
+        "--breaker-threshold", type=int, default=None,
+        help="ошибок подряд до размыкания цепи (по умолчанию как в retry.CircuitBreaker)",
+    )
+    parser.add_argument(
+        "--breaker-reset", type=float, default=None,
+        help="на сколько секунд размыкается цепь (по умолчанию как в retry.CircuitBreaker)",
+    )
+    parser.add_argument("--output", help="сохранить отчёт в JSON")
+    parser.add_argument("--compare", help="сравнить с сохранённым отчётом")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    # Все запросы к фикстурам идут на один хост и попадают в один предохранитель
+    breaker_options = {}
+    if args.breaker_threshold is not None:
+        breaker_options["failure_threshold"] = args.breaker_threshold
+    if args.breaker_reset is not None:
+        breaker_options["reset_timeout"] = args.breaker_reset
+    breakers.configure(**breaker_options)
+
+    faults = faults_from_args(args)
+    site = FixtureSite(nga_items=args.nga_items, vangogh_items=args.vangogh_items, faults=faults)
+    server = start_server(site)
+    # Адреса сайтов читаются скраперами при импорте
+    os.environ["NGA_BASE_URL"] = server.base_url
+    os.environ["VANGOGH_BASE_URL"] = server.base_url
+    import high
+    from browser import DriverPool
+    from downloader import download_image
+    from http_client import create_session
+    from parse_pool import ParsePool
+    import nga_parser
+
+    high.parse_pool = ParsePool(args.parse_workers, args.parser, args.extractor)
+    timer = StageTimer()
+    session = create_session(pool_size=args.workers * 2)
+    skipped = []
+    with tempfile.TemporaryDirectory() as folder:
+        print("NGA без браузера...")
+        listings = bench_nga_http(timer, high, session, site, args.workers)
+        print("Изображения...")
+        bench_images(timer, download_image, listings, session, folder, args.workers)
+        print("Извлечение полей...")
+        bench_extractors(timer, high, session, site, skipped)
+        nga_parser.set_parser(args.parser, args.extractor)
+
+        if not args.no_browser:
+            driver_pool = DriverPool(size=args.workers, implicit_wait=0, blocking=high.BLOCKING_PROFILE)
+            try:
+                print("NGA в браузере...")
+                # Первый драйвер запускается отдельно: если Chrome нет, браузерные этапы пропускаются
+                started = time.perf_counter()
+                driver_pool.release(driver_pool.acquire())
+                timer.record("driver_startup", time.perf_counter() - started)
+                bench_nga_browser(timer, high, driver_pool, session, site, args.workers, folder)
+                print("Van Gogh в браузере...")
+                bench_vangogh(timer, load_vangogh(), driver_pool, site, args.workers, folder)
+            except WebDriverException as e:
+                skipped.append(f"браузерные этапы: {str(e).splitlines()[0]}")
+            finally:
+                driver_pool.close()
+
+    session.close()
+    high.parse_pool.close()
+    server.shutdown()
+
+    snapshot = metrics.snapshot()
+    breaker_wait = snapshot["stages"].get("breaker_wait", {})
+    report = {
+        "stages": timer.report(),
+        "peak_rss_mb": peak_rss_mb(),
+        "faults": faults.injected if faults else None,
+        "breaker": {
+            "options": breakers.options,
+            "opened": snapshot["counters"].get("circuit_opened", 0),
+            "waits": breaker_wait.get("count", 0),
+            "wait_s": round(breaker_wait.get("total", 0.0), 2),
+        },
+        "parser": args.parser,
+        "extractor": args.extractor,
+        "parse_workers": args.parse_workers,
+        "skipped": skipped,
+    }
+    print(f"\n{'этап':28} {'страниц':>8} {'стр/с':>8} {'p50 мс':>8} {'p95 мс':>8} {'ошибок':>7}")
+    for stage, row in report["stages"].items():
+        print(
+            f"{stage:28} {row['pages']:>8} {row['pages_per_sec']!s:>8} {row['p50_ms']:>8} "
+            f"{row['p95_ms']:>8} {row['errors']:>7}"
+        )
+    print(f"Пиковый RSS, МБ: {report['peak_rss_mb']}")
+    if faults:
+        print(f"Внесённые сбои: {faults.injected}")
+    breaker = report["breaker"]
+    print(
+        f"Предохранитель: разомкнут {breaker['opened']} раз, "
+        f"ожидание {breaker['wait_s']} с в {breaker['waits']} запросах"
+    )
+    for reason in skipped:
+        print(f"Пропущено: {reason}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4, ensure_ascii=False)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
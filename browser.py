@@ -0,0 +1,338 @@
+import base64
+import json
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import JavascriptException, TimeoutException, WebDriverException
+
+from metrics import metrics
+
+
+def extension_patterns(*extensions):
+    """Шаблоны URL, путь которых оканчивается расширением: "*.png" и "*.png?*".
+
+    Шаблон применяется ко всему URL, поэтому "*.png*" заблокировал бы и
+    страницу с ".png" в параметрах запроса (/search?q=logo.png&page=2).
+    """
+    return tuple(pattern for ext in extensions for pattern in (f"*.{ext}", f"*.{ext}?*"))
+
+
+# Шаблоны URL для Network.setBlockedURLs (* - любая подстрока). Скраперы читают
+# только DOM, поэтому картинки, видео и шрифты браузеру не нужны: изображения
+# всё равно скачиваются отдельно через download_image.
+IMAGE_PATTERNS = extension_patterns("jpg", "jpeg", "png", "gif", "webp", "avif", "svg", "ico")
+MEDIA_PATTERNS = extension_patterns("mp4", "webm", "m3u8", "mp3", "ogg")
+FONT_PATTERNS = extension_patterns("woff", "woff2", "ttf", "otf", "eot")
+# Сторонние скрипты аналитики, рекламы и встроенного видео. Запросы к самому
+# сайту (в том числе XHR/fetch, которыми заполняются страницы) не блокируются.
+THIRD_PARTY_PATTERNS = (
+    "*googletagmanager.com*",
+    "*google-analytics.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*facebook.net*",
+    "*connect.facebook.com*",
+    "*hotjar.com*",
+    "*siteimproveanalytics.*",
+    "*cookielaw.org*",
+    "*onetrust.com*",
+    "*youtube.com*",
+    "*ytimg.com*",
+    "*vimeo.com*",
+    "*vimeocdn.com*",
+)
+
+# Профили блокировки запросов, которые можно выбрать для драйверов скраперов
+BLOCKING_PROFILES = {
+    "none": (),
+    "images": IMAGE_PATTERNS + MEDIA_PATTERNS,
+    "lean": IMAGE_PATTERNS + MEDIA_PATTERNS + FONT_PATTERNS + THIRD_PARTY_PATTERNS,
+}
+
+# Объём и время загрузки открытой страницы по Navigation/Resource Timing.
+# transferSize сторонних ресурсов без Timing-Allow-Origin равен 0, поэтому
+# байты - нижняя оценка; заблокированные запросы в записи не попадают.
+PAGE_WEIGHT_SCRIPT = """
+const entries = performance.getEntriesByType("navigation")
+  .concat(performance.getEntriesByType("resource"));
+const nav = performance.getEntriesByType("navigation")[0];
+let bytes = 0;
+for (const entry of entries) bytes += entry.transferSize || entry.encodedBodySize || 0;
+return {
+  bytes: bytes,
+  requests: entries.length,
+  load_ms: nav ? Math.round(nav.loadEventEnd || nav.domContentLoadedEventEnd || nav.duration) : null,
+};
+"""
+
+
+def apply_blocking_profile(driver, profile):
+    """Включает для драйвера блокировку запросов по профилю из BLOCKING_PROFILES через CDP."""
+    patterns = BLOCKING_PROFILES[profile]
+    if patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+    driver.blocking_profile = profile
+
+
+def page_source(driver):
+    """Возвращает HTML открытой страницы (сериализация DOM замеряется как этап page_source)."""
+    with metrics.timed("page_source"):
+        return driver.page_source
+
+
+def create_driver(headless=True, implicit_wait=5, blocking="none", capture_network=False):
+    """Создаёт новый экземпляр Chrome с общими для скраперов настройками.
+
+    `blocking` - имя профиля из BLOCKING_PROFILES: какие запросы страницы
+    браузер не будет выполнять. С `capture_network` включается лог
+    производительности, из которого NetworkCapture читает сетевые ответы.
+    """
+    if blocking not in BLOCKING_PROFILES:
+        raise ValueError(f"Неизвестный профиль блокировки: {blocking}")
+    options = webdriver.ChromeOptions()
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    if headless:
+        options.add_argument("--headless")
+    if capture_network:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    with metrics.timed("driver_startup"):
+        driver = webdriver.Chrome(options=options)
+    driver.implicitly_wait(implicit_wait)
+    apply_blocking_profile(driver, blocking)
+    return driver
+
+
+class NetworkCapture:
+    """Читает JSON-ответы XHR/fetch страницы из лога производительности Chrome.
+
+    Драйвер должен быть создан с capture_network=True. Тело ответа
+    запрашивается через CDP Network.getResponseBody, когда ответ загружен
+    полностью; ответы, которые ещё грузятся, запоминаются до следующего вызова.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._pending = {}
+
+    def json_responses(self, url_filter=None):
+        """Возвращает [(url, разобранный JSON)] для ответов, загруженных с прошлого вызова."""
+        finished = []
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                response = params["response"]
+                if "json" in response.get("mimeType", "") and (url_filter is None or url_filter(response["url"])):
+                    self._pending[params["requestId"]] = response["url"]
+            elif method == "Network.loadingFinished" and params.get("requestId") in self._pending:
+                finished.append((params["requestId"], self._pending.pop(params["requestId"])))
+
+        responses = []
+        for request_id, url in finished:
+            try:
+                body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            except WebDriverException as e:
+                logging.debug(f"Тело ответа {url} недоступно: {e}")
+                continue
+            text = body.get("body", "")
+            if body.get("base64Encoded"):
+                text = base64.b64decode(text).decode("utf-8", "replace")
+            try:
+                responses.append((url, json.loads(text)))
+            except ValueError:
+                logging.debug(f"Ответ {url} не является JSON")
+        return responses
+
+
+class ResourceReport:
+    """Объём и время загрузки страниц по профилям блокировки.
+
+    Если есть замеры с профилем "none", для остальных профилей считается,
+    сколько байт и миллисекунд в среднем экономится на странице.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, profile, weight):
+        with self._lock:
+            stats = self._stats.setdefault(
+                profile, {"pages": 0, "bytes": 0, "requests": 0, "load_ms": 0, "timed": 0}
+            )
+            stats["pages"] += 1
+            stats["bytes"] += weight["bytes"]
+            stats["requests"] += weight["requests"]
+            if weight.get("load_ms") is not None:
+                stats["load_ms"] += weight["load_ms"]
+                stats["timed"] += 1
+
+    def summary(self):
+        """Возвращает {профиль: {pages, kb_per_page, requests_per_page, load_ms, saved_kb, saved_ms}}."""
+        with self._lock:
+            result = {}
+            for profile, stats in self._stats.items():
+                result[profile] = {
+                    "pages": stats["pages"],
+                    "kb_per_page": round(stats["bytes"] / stats["pages"] / 1024, 1),
+                    "requests_per_page": round(stats["requests"] / stats["pages"], 1),
+                    "load_ms": round(stats["load_ms"] / stats["timed"]) if stats["timed"] else None,
+                }
+            baseline = result.get("none")
+            if baseline:
+                for profile, row in result.items():
+                    if profile == "none":
+                        continue
+                    row["saved_kb"] = round(baseline["kb_per_page"] - row["kb_per_page"], 1)
+                    if baseline["load_ms"] is not None and row["load_ms"] is not None:
+                        row["saved_ms"] = baseline["load_ms"] - row["load_ms"]
+            return result
+
+
+# Общий отчёт о загруженных страницах для обоих скраперов
+resource_report = ResourceReport()
+
+
+def measure_page(driver):
+    """Записывает в resource_report объём и время загрузки открытой страницы."""
+    try:
+        weight = driver.execute_script(PAGE_WEIGHT_SCRIPT)
+    except JavascriptException as e:
+        logging.debug(f"Не удалось измерить страницу: {e}")
+        return None
+    resource_report.record(getattr(driver, "blocking_profile", "none"), weight)
+    return weight
+
+
+def compare_blocking_profiles(urls, profiles=("none", "images", "lean"), headless=True):
+    """Открывает одни и те же страницы с каждым профилем и возвращает сравнение.
+
+    Для каждого профиля запускается отдельный браузер, чтобы кэш одного
+    профиля не занижал объём загрузки другого.
+    """
+    report = ResourceReport()
+    for profile in profiles:
+        driver = create_driver(headless, implicit_wait=0, blocking=profile)
+        try:
+            for url in urls:
+                driver.get(url)
+                report.record(profile, driver.execute_script(PAGE_WEIGHT_SCRIPT))
+        finally:
+            driver.quit()
+    return report.summary()
+
+
+class DriverPool:
+    """Ограниченный пул переиспользуемых драйверов Chrome.
+
+    Драйверы создаются лениво, не больше `size` одновременно. Драйвер
+    пересоздаётся после `max_pages` страниц, при падении или если он не
+    прошёл проверку работоспособности при выдаче. Всем драйверам пула
+    назначается профиль блокировки запросов `blocking`.
+    """
+
+    def __init__(self, size=5, max_pages=50, headless=True, implicit_wait=5, blocking="none"):
+        self.size = size
+        self.max_pages = max_pages
+        self.headless = headless
+        self.implicit_wait = implicit_wait
+        self.blocking = blocking
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._closed = False
+
+    def _create(self):
+        driver = create_driver(self.headless, self.implicit_wait, self.blocking)
+        with self._lock:
+            self._pages[id(driver)] = 0
+        logging.debug(f"Создан новый драйвер (всего в пуле: {len(self._pages)})")
+        return driver
+
+    def _destroy(self, driver):
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except WebDriverException as e:
+            logging.debug(f"Ошибка при закрытии драйвера: {e}")
+
+    @staticmethod
+    def _is_healthy(driver):
+        """Проверяет, что браузер отвечает на команды."""
+        try:
+            driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            return False
+
+    def acquire(self, timeout=None):
+        """Выдаёт драйвер из пула, при необходимости создавая новый."""
+        if self._closed:
+            raise RuntimeError("Пул драйверов уже закрыт.")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Не удалось получить драйвер из пула.")
+
+        try:
+            while True:
+                try:
+                    driver = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._create()
+                if self._is_healthy(driver):
+                    return driver
+                logging.warning("Драйвер не прошёл проверку и будет пересоздан.")
+                self._destroy(driver)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, driver, broken=False):
+        """Возвращает драйвер в пул или закрывает его, если он отработал своё."""
+        try:
+            with self._lock:
+                pages = self._pages.get(id(driver), 0) + 1
+                self._pages[id(driver)] = pages
+
+            if broken or self._closed or pages >= self.max_pages:
+                self._destroy(driver)
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Контекстный менеджер: берёт драйвер и гарантированно возвращает его."""
+        driver = self.acquire(timeout)
+        broken = False
+        try:
+            yield driver
+        except TimeoutException:
+            raise
+        except WebDriverException:
+            # Любая другая ошибка драйвера считается падением браузера
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def close(self):
+        """Закрывает все простаивающие драйверы."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._destroy(driver)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import re
+import threading
+import time
+
+from storage import JsonLinesWriter
+
+# Части HTML, которые меняются от загрузки к загрузке, не меняя содержимого страницы
+VOLATILE_HTML_RE = re.compile(
+    r"<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->", re.IGNORECASE | re.DOTALL
+)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def content_hash(value):
+    """sha256 строки или JSON-значения (ключи словарей сортируются)."""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def html_hash(html):
+    """Хэш HTML без скриптов, стилей, комментариев и различий в пробелах."""
+    return content_hash(WHITESPACE_RE.sub(" ", VOLATILE_HTML_RE.sub("", html)).strip())
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ChangeTracker:
+    """Хэши содержимого записей между запусками и лента изменений.
+
+    Для каждой записи в CrawlState хранятся хэши элемента списка, HTML
+    детальной страницы, каждого поля записи и изображения. Страницу,
+    у которой не изменились ни элемент списка, ни HTML, можно не разбирать
+    (см. unchanged). Изменения пишутся в `feed_path` (JSON Lines) строками
+    {run, at, change: added/modified/removed, key, url, fields}.
+
+    Первый такой обход после обычных запусков строит базу хэшей, поэтому
+    все записи в нём попадают в ленту как added.
+    """
+
+    def __init__(self, state, feed_path, ignored_fields=()):
+        self.state = state
+        self.run = int(state.get_meta("content_run", 0)) + 1
+        state.set_meta("content_run", self.run)
+        self.ignored_fields = set(ignored_fields)
+        self.counts = {"added": 0, "modified": 0, "removed": 0, "unchanged": 0}
+        self._feed = JsonLinesWriter(feed_path, fsync_every=1, mode="a")
+        self._lock = threading.Lock()
+
+    def _emit(self, change, key, url, fields=None):
+        with self._lock:
+            self.counts[change] += 1
+        entry = {"run": self.run, "at": time.time(), "change": change, "key": key, "url": url}
+        if fields:
+            entry["fields"] = fields
+        self._feed.write(entry)
+
+    def seen(self, key, url):
+        """Отмечает, что запись есть в списке на этом обходе."""
+        self.state.mark_seen(key, url, self.run)
+
+    def unchanged(self, key, listing_hash, page_hash):
+        """True, если запись уже разобрана и её элемент списка и HTML не изменились."""
+        stored = self.state.content(key)
+        if (
+            stored is None
+            or stored["field_hashes"] is None
+            or page_hash is None
+            or stored["listing_hash"] != listing_hash
+            or stored["page_hash"] != page_hash
+        ):
+            return False
+        with self._lock:
+            self.counts["unchanged"] += 1
+        return True
+
+    def record(self, key, url, record, listing_hash, page_hash):
+        """Сохраняет хэши разобранной записи.
+
+        Возвращает ("added", None), ("modified", изменённые поля) или (None, []), если запись не изменилась.
+        """
+        field_hashes = {
+            field: content_hash(value)
+            for field, value in record.items()
+            if field not in self.ignored_fields
+        }
+        stored = self.state.content(key)
+        previous = json.loads(stored["field_hashes"]) if stored and stored["field_hashes"] else None
+        self.state.save_content(
+            key,
+            listing_hash=listing_hash,
+            page_hash=page_hash,
+            field_hashes=json.dumps(field_hashes, sort_keys=True),
+        )
+
+        if previous is None:
+            self._emit("added", key, url)
+            return "added", None
+        fields = sorted(
+            field for field in set(previous) | set(field_hashes)
+            if previous.get(field) != field_hashes.get(field)
+        )
+        if not fields:
+            with self._lock:
+                self.counts["unchanged"] += 1
+            return None, []
+        self._emit("modified", key, url, fields)
+        return "modified", fields
+
+    def image(self, key, url, path):
+        """Сохраняет хэш скачанного изображения; новое содержимое попадает в ленту как modified."""
+        new_hash = file_hash(path)
+        stored = self.state.content(key)
+        self.state.save_content(key, image_hash=new_hash)
+        if stored and stored["image_hash"] and stored["image_hash"] != new_hash:
+            self._emit("modified", key, url, ["image"])
+
+    def finish(self, complete=True):
+        """Закрывает ленту. Если список пройден полностью (`complete`), записи,
+        которых в нём не было, отмечаются как removed. Возвращает [(ключ, URL)] удалённых."""
+        removed = self.state.unseen(self.run) if complete else []
+        for key, url in removed:
+            self._emit("removed", key, url)
+            self.state.forget_content(key)
+        self._feed.close()
+        return removed
@@ -0,0 +1,94 @@
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+from http_client import get_session
+from metrics import metrics
+from retry import CircuitOpenError, retry_call
+
+
+def _fetch_to_file(url, folder, filename, session, timeout):
+    """Одна попытка загрузки: пишет тело во временный *.part и переименовывает его."""
+    temp_path = None
+    try:
+        with session.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+
+            os.makedirs(folder, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=folder, prefix=f".{filename}.", suffix=".part", delete=False
+            ) as file:
+                temp_path = file.name
+                for chunk in response.iter_content(65536):
+                    file.write(chunk)
+
+        os.replace(temp_path, os.path.join(folder, filename))
+    except BaseException:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def download_image(url, folder, filename, session=None, timeout=60, attempts=3):
+    """Скачивает изображение из URL и сохраняет его в указанной папке.
+
+    Файл сначала пишется во временный *.part рядом с целевым и затем
+    атомарно переименовывается, поэтому оборванная загрузка не оставляет
+    битых изображений. Временные ошибки (сеть, 429/5xx) повторяются до
+    `attempts` раз. Возвращает True или False, если изображение не скачано.
+    """
+    session = session or get_session()
+    try:
+        with metrics.timed("image_download"):
+            retry_call(
+                lambda: _fetch_to_file(url, folder, filename, session, timeout), url, attempts=attempts
+            )
+        return True
+    except (requests.exceptions.RequestException, CircuitOpenError, OSError) as e:
+        logging.error(f"Ошибка при скачивании изображения {url}: {e}")
+        return False
+
+
+class ImageDownloader:
+    """Пул потоков для параллельной загрузки изображений.
+
+    Все загрузки идут через одну keep-alive сессию; одновременно к одному
+    хосту выполняется не больше `per_host` запросов. Если передан
+    `dead_letters` (JsonLinesWriter), изображения, которые не скачались и
+    после повторов, записываются в него для повторной загрузки позже.
+    """
+
+    def __init__(self, session=None, max_workers=8, per_host=4, dead_letters=None):
+        self.session = session or get_session()
+        self.per_host = per_host
+        self.dead_letters = dead_letters
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image")
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def _download(self, url, folder, filename):
+        with self._host_limit(url):
+            downloaded = download_image(url, folder, filename, self.session)
+        if not downloaded and self.dead_letters is not None:
+            self.dead_letters.write({"url": url, "folder": folder, "filename": filename})
+        return downloaded
+
+    def submit(self, url, folder, filename):
+        """Ставит изображение в очередь загрузки. Возвращает Future с результатом (bool)."""
+        return self._executor.submit(self._download, url, folder, filename)
+
+    def close(self, wait=True):
+        """Дожидается (если wait) завершения загрузок и останавливает потоки."""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,237 @@
+import re
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # без lxml доступно только извлечение через BeautifulSoup
+    lxml_html = None
+
+# Простой селектор: тег, #id и .классы без пробелов (div#provenance, p.attribution, .object-attr.medium)
+SIMPLE_SELECTOR_RE = re.compile(r"^([a-zA-Z][\w-]*)?((?:[.#][\w-]+)*)$")
+SELECTOR_PART_RE = re.compile(r"([.#])([\w-]+)")
+
+# Содержимое этих тегов не считается текстом (как в BeautifulSoup.get_text)
+NON_TEXT_TAGS = ("script", "style", "template")
+
+
+def exists(element):
+    """Значение поля-флага: элемент найден."""
+    return True
+
+
+def element_text(element):
+    """Текст элемента как get_text(strip=True): все строки без пробелов по краям, подряд."""
+    return "".join(part.strip() for part in element.itertext())
+
+
+class _Step:
+    """Один простой селектор цепочки."""
+
+    __slots__ = ("tag", "id", "classes", "key")
+
+    def __init__(self, selector):
+        match = SIMPLE_SELECTOR_RE.match(selector)
+        if match is None or not selector:
+            raise ValueError(f"Неподдерживаемый селектор: {selector!r}")
+        self.tag = match.group(1)
+        self.id = None
+        classes = []
+        for kind, name in SELECTOR_PART_RE.findall(match.group(2)):
+            if kind == "#":
+                self.id = name
+            else:
+                classes.append(name)
+        self.classes = frozenset(classes)
+        # Ключ, по которому шаг ищется в индексе при обходе: самый избирательный признак
+        if self.id:
+            self.key = "#" + self.id
+        elif classes:
+            self.key = "." + classes[0]
+        else:
+            self.key = self.tag
+
+    def matches(self, tag, element_id, classes):
+        return (
+            (self.tag is None or self.tag == tag)
+            and (self.id is None or self.id == element_id)
+            and self.classes <= classes
+        )
+
+
+def _steps(selector):
+    return [_Step(part) for part in selector.split()]
+
+
+class _Field:
+    def __init__(self, name, spec):
+        self.name = name
+        self.many = spec.get("many", False)
+        self.value = spec.get("value", "text")
+        self.clean = spec.get("clean")
+        self.contains = spec.get("contains")
+        self.next = spec.get("next")
+        self.index = spec.get("index", 0)
+        self.section = spec.get("section")
+
+    def read(self, element):
+        if self.value == "text":
+            return element_text(element)
+        if isinstance(self.value, str) and self.value.startswith("@"):
+            return element.get(self.value[1:])
+        return self.value(element)
+
+
+class FieldExtractor:
+    """Извлекает поля по декларативной спецификации за один обход дерева lxml.
+
+    Спецификация - словарь {поле: правило}. Правило:
+      select   - цепочка простых селекторов через пробел ("div#provenance p");
+      many     - собрать все совпадения в список (иначе берётся одно);
+      index    - номер совпадения для одиночного поля (по умолчанию первое);
+      value    - "text" (по умолчанию), "@атрибут" или функция от элемента;
+                 None в результате функции отбрасывает совпадение;
+      clean    - функция, которая обрабатывает каждое значение;
+      section  - (контейнер, заголовок, текст): совпадения ищутся внутри
+                 контейнера, первый заголовок которого равен тексту;
+                 select тогда задаётся относительно контейнера;
+      contains - строка или кортеж строк, одна из которых должна быть в тексте совпадения;
+      next     - тег следующего соседа, из которого берётся значение (dt -> dd).
+    Поля без совпадений получают None, а поля с many - пустой список.
+
+    Все селекторы компилируются один раз в индекс по id, классу и тегу;
+    при обходе каждый элемент проверяется только по шагам с его признаками.
+    """
+
+    def __init__(self, fields):
+        self.fields = [_Field(name, spec) for name, spec in fields.items()]
+        # Цепочка: (шаги, номер шага-контейнера или None)
+        self._chains = []
+        self._field_chains = []
+        self._heading_chains = {}
+        for field, spec in zip(self.fields, fields.values()):
+            if field.section:
+                container, heading, _ = field.section
+                anchor = len(_steps(container)) - 1
+                if (container, heading) not in self._heading_chains:
+                    self._heading_chains[(container, heading)] = self._add_chain(
+                        _steps(container) + _steps(heading), anchor
+                    )
+                chain = self._add_chain(_steps(container) + _steps(spec["select"]), anchor)
+            else:
+                chain = self._add_chain(_steps(spec["select"]), None)
+            self._field_chains.append(chain)
+
+        self._index = {}
+        for chain_id, (steps, _) in enumerate(self._chains):
+            for position, step in enumerate(steps):
+                self._index.setdefault(step.key, []).append((chain_id, position))
+
+    def _add_chain(self, steps, anchor):
+        self._chains.append((steps, anchor))
+        return len(self._chains) - 1
+
+    def parse(self, html):
+        """Разбирает HTML в дерево lxml без содержимого script/style/template."""
+        if lxml_html is None:
+            raise ValueError("Для извлечения по спецификации нужен пакет lxml (pip install lxml)")
+        root = lxml_html.document_fromstring(html)
+        etree.strip_elements(root, *NON_TEXT_TAGS, with_tail=False)
+        return root
+
+    def _walk(self, root):
+        """Один обход дерева: для каждой цепочки список (контейнер, элемент) в порядке документа."""
+        chains = self._chains
+        index = self._index
+        found = [[] for _ in chains]
+
+        def visit(element, state):
+            tag = element.tag
+            if not isinstance(tag, str):  # комментарии и инструкции обработки
+                return
+            element_id = element.get("id")
+            classes = element.get("class")
+            classes = frozenset(classes.split()) if classes else frozenset()
+
+            keys = [tag]
+            if element_id:
+                keys.append("#" + element_id)
+            keys.extend("." + name for name in classes)
+
+            own = None
+            for key in keys:
+                for chain_id, position in index.get(key, ()):
+                    steps, anchor = chains[chain_id]
+                    if not steps[position].matches(tag, element_id, classes):
+                        continue
+                    if position == 0:
+                        container = None
+                    elif (chain_id, position - 1) in state:
+                        container = state[(chain_id, position - 1)]
+                    else:
+                        continue
+                    if position == anchor:
+                        container = element
+                    if position == len(steps) - 1:
+                        found[chain_id].append((container, element))
+                    else:
+                        if own is None:
+                            own = dict(state)
+                        own[(chain_id, position)] = container
+
+            child_state = state if own is None else own
+            for child in element:
+                visit(child, child_state)
+
+        visit(root, {})
+        return found
+
+    def extract(self, html):
+        """Возвращает {поле: значение} в порядке спецификации."""
+        root = self.parse(html) if isinstance(html, str) else html
+        found = self._walk(root)
+
+        headings = {}
+        for key, chain_id in self._heading_chains.items():
+            first = {}
+            for container, element in found[chain_id]:
+                if container not in first:
+                    first[container] = element_text(element)
+            headings[key] = first
+
+        result = {}
+        for field, chain_id in zip(self.fields, self._field_chains):
+            elements = found[chain_id]
+            if field.section:
+                container, heading, title = field.section
+                titles = headings[(container, heading)]
+                elements = [pair for pair in elements if titles.get(pair[0]) == title]
+            elements = [element for _, element in elements]
+            if field.contains:
+                needles = (field.contains,) if isinstance(field.contains, str) else field.contains
+                elements = [
+                    element for element in elements
+                    if any(needle in element_text(element) for needle in needles)
+                ]
+            if field.next:
+                elements = [
+                    sibling for sibling in (next(element.itersiblings(field.next), None) for element in elements)
+                    if sibling is not None
+                ]
+
+            values = []
+            for element in elements if field.many else elements[field.index:field.index + 1]:
+                value = field.read(element)
+                if value is None:
+                    continue
+                values.append(field.clean(value) if field.clean else value)
+
+            if field.many:
+                result[field.name] = values
+            else:
+                result[field.name] = values[0] if values else None
+        return result
+
+
+def compile_spec(fields):
+    """Компилирует спецификацию полей сайта (см. FieldExtractor)."""
+    return FieldExtractor(fields)
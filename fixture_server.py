@@ -0,0 +1,393 @@
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Записанные страницы NGA и Van Gogh Museum. В шаблонах подставляются
+# значения вида {object_id}; остальные фигурные скобки (JS, CSS) не трогаются.
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as file:
+        return file.read()
+
+
+def render(template, **values):
+    for name, value in values.items():
+        template = template.replace("{" + name + "}", str(value))
+    return template
+
+
+# Раздел страницы, который Faults может убрать: <!-- section:имя --> ... <!-- /section:имя -->
+SECTION_RE = re.compile(r"<!-- section:([\w-]+) -->.*?<!-- /section:\1 -->\n?", re.DOTALL)
+
+
+def parse_latency(spec):
+    """Разбирает описание задержки в функцию, возвращающую секунды.
+
+    Форматы (миллисекунды): "fixed:200", "uniform:50:500",
+    "lognormal:200:0.8" (медиана и sigma - длинный хвост, как у живого сайта).
+    """
+    if not spec:
+        return None
+    kind, *values = spec.split(":")
+    values = [float(value) for value in values]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(0, values[1]) * values[0] / 1000
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+
+class Faults:
+    """Сбои, которые сервер фикстур подмешивает в ответы.
+
+    Виды запросов: "page" (HTML), "api" (JSON) и "image"; сбои действуют
+    только на виды из `kinds`.
+
+      latency        - задержка перед ответом (см. parse_latency)
+      error_rate     - вероятность начала серии ошибок длиной burst_length
+                       запросов; статус берётся из error_statuses, у 429 и
+                       503 есть Retry-After. Все запросы к фикстурам идут
+                       на один хост, поэтому серия не короче порога
+                       предохранителя (retry.CircuitBreaker) размыкает цепь
+      truncate_rate  - вероятность оборвать тело на середине
+                       (Content-Length при этом полный)
+      image_chunk_delay - пауза в секундах перед каждым блоком изображения
+                       (медленная отдача)
+      missing_rate   - вероятность убрать с детальной страницы разделы
+                       missing_sections (все размеченные, если не заданы)
+    """
+
+    def __init__(self, latency=None, error_rate=0.0, burst_length=2, error_statuses=(429, 500, 503),
+                 retry_after=1, truncate_rate=0.0, image_chunk_delay=0.0, missing_rate=0.0,
+                 missing_sections=None, kinds=("page", "api", "image"), seed=None):
+        self.latency = parse_latency(latency) if isinstance(latency, str) else latency
+        self.error_rate = error_rate
+        self.burst_length = burst_length
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.truncate_rate = truncate_rate
+        self.image_chunk_delay = image_chunk_delay
+        self.missing_rate = missing_rate
+        self.missing_sections = set(missing_sections) if missing_sections else None
+        self.kinds = set(kinds)
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._burst_left = 0
+        self._burst_status = None
+        self.injected = {"delayed": 0, "errors": 0, "truncated": 0, "sections_removed": 0}
+
+    def _chance(self, rate):
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def _count(self, name):
+        with self._lock:
+            self.injected[name] += 1
+
+    def delay(self, kind):
+        """Выдерживает задержку для запроса (если задана)."""
+        if self.latency is None or kind not in self.kinds:
+            return
+        with self._lock:
+            seconds = self.latency(self._rng)
+        self._count("delayed")
+        time.sleep(seconds)
+
+    def error(self, kind):
+        """Возвращает статус ошибки, если запрос попал в серию ошибок, иначе None."""
+        if kind not in self.kinds:
+            return None
+        with self._lock:
+            if self._burst_left == 0 and self.error_rate > 0 and self._rng.random() < self.error_rate:
+                self._burst_left = self.burst_length
+                self._burst_status = self._rng.choice(self.error_statuses)
+            if self._burst_left == 0:
+                return None
+            self._burst_left -= 1
+            self.injected["errors"] += 1
+            return self._burst_status
+
+    def truncate(self, kind):
+        if kind in self.kinds and self._chance(self.truncate_rate):
+            self._count("truncated")
+            return True
+        return False
+
+    def strip_sections(self, html):
+        """С вероятностью missing_rate убирает из страницы размеченные разделы."""
+        if "page" not in self.kinds or not self._chance(self.missing_rate):
+            return html
+
+        def remove(match):
+            if self.missing_sections is None or match.group(1) in self.missing_sections:
+                return ""
+            return match.group(0)
+
+        self._count("sections_removed")
+        return SECTION_RE.sub(remove, html)
+
+
+class FixtureSite:
+    """Локальная копия страниц обоих музеев с заданным количеством произведений.
+
+    Пути повторяют настоящие сайты, поэтому скраперам достаточно заменить
+    базовый адрес (NGA_BASE_URL и VANGOGH_BASE_URL):
+
+      /collection/highlights.html?pageNumber=N   страница списка NGA
+      /collection/art-object-page.<id>.html      детальная страница NGA
+      /nl/collectie                              сетка коллекции Van Gogh
+      /api/collectie?page=N&pageSize=M           JSON, которым сетка дополняется при прокрутке
+      /nl/collectie/<номер объекта>              детальная страница Van Gogh
+      /images/nga/<id>.jpg, /iiif/<номер>/default.jpg   изображения
+
+    Если передан `faults` (Faults), ответы замедляются и портятся по его настройкам.
+    """
+
+    def __init__(self, nga_items=60, nga_page_size=24, vangogh_items=60, vangogh_page_size=24,
+                 image_bytes=50_000, faults=None):
+        self.faults = faults
+        self.nga_items = nga_items
+        self.nga_page_size = nga_page_size
+        self.vangogh_items = vangogh_items
+        self.vangogh_page_size = vangogh_page_size
+        self.image = b"\xff\xd8\xff\xe0" + b"\0" * max(0, image_bytes - 6) + b"\xff\xd9"
+        self.base_url = ""
+
+        self.templates = {
+            name: load_fixture(name + ".html")
+            for name in (
+                "nga_highlights",
+                "nga_highlight_item",
+                "nga_detail",
+                "vangogh_collection",
+                "vangogh_collection_item",
+                "vangogh_detail",
+            )
+        }
+
+    @staticmethod
+    def nga_object_id(index):
+        return 1000 + index
+
+    @staticmethod
+    def vangogh_code(index):
+        return f"s{index:04d}V1962"
+
+    def nga_detail_urls(self):
+        return [
+            f"{self.base_url}/collection/art-object-page.{self.nga_object_id(index)}.html"
+            for index in range(self.nga_items)
+        ]
+
+    def vangogh_item(self, index):
+        code = self.vangogh_code(index)
+        return {
+            "objectNumber": code,
+            "title": f"Schilderij {index}",
+            "link": f"/nl/collectie/{code}",
+            "image": {"url": f"{self.base_url}/iiif/{code}/default.jpg"},
+        }
+
+    @staticmethod
+    def kind(path):
+        """Вид запроса для Faults: "image", "api" или "page"."""
+        if path.startswith("/images/") or path.startswith("/iiif/"):
+            return "image"
+        if path.startswith("/api/"):
+            return "api"
+        return "page"
+
+    def detail_page(self, template, **values):
+        html = render(template, **values)
+        if self.faults is not None:
+            html = self.faults.strip_sections(html)
+        return html
+
+    def route(self, path, query):
+        """Возвращает (статус, Content-Type, тело) для пути запроса."""
+        if path == "/collection/highlights.html":
+            page = int(query.get("pageNumber", ["1"])[0])
+            return 200, "text/html; charset=utf-8", self.nga_listing(page)
+        if path.startswith("/collection/art-object-page.") and path.endswith(".html"):
+            object_id = path[len("/collection/art-object-page."):-len(".html")]
+            if object_id.isdigit() and 0 <= int(object_id) - 1000 < self.nga_items:
+                return 200, "text/html; charset=utf-8", self.detail_page(self.templates["nga_detail"], object_id=object_id)
+        elif path == "/nl/collectie":
+            return 200, "text/html; charset=utf-8", self.vangogh_collection()
+        elif path.startswith("/nl/collectie/"):
+            code = path[len("/nl/collectie/"):]
+            index = self.vangogh_index(code)
+            if index is not None:
+                return 200, "text/html; charset=utf-8", self.detail_page(
+                    self.templates["vangogh_detail"], code=code, title=f"Schilderij {index}"
+                )
+        elif path == "/api/collectie":
+            page = int(query.get("page", ["1"])[0])
+            page_size = int(query.get("pageSize", [str(self.vangogh_page_size)])[0])
+            start = (page - 1) * page_size
+            items = [self.vangogh_item(index) for index in range(start, min(start + page_size, self.vangogh_items))]
+            body = json.dumps({"total": self.vangogh_items, "page": page, "items": items})
+            return 200, "application/json", body
+        elif path.startswith("/images/nga/") or path.startswith("/iiif/"):
+            return 200, "image/jpeg", self.image
+        return 404, "text/plain; charset=utf-8", "Not found"
+
+    def vangogh_index(self, code):
+        if len(code) == 10 and code.startswith("s") and code[1:5].isdigit():
+            index = int(code[1:5])
+            if index < self.vangogh_items:
+                return index
+        return None
+
+    def nga_listing(self, page):
+        start = (page - 1) * self.nga_page_size
+        items = []
+        for index in range(max(0, start), min(start + self.nga_page_size, self.nga_items)):
+            object_id = self.nga_object_id(index)
+            items.append(render(
+                self.templates["nga_highlight_item"],
+                object_id=object_id,
+                image_url=f"{self.base_url}/images/nga/{object_id}.jpg",
+            ))
+        pager = f'<a href="?pageNumber={page + 1}">Next</a>' if start + self.nga_page_size < self.nga_items else ""
+        return render(self.templates["nga_highlights"], items="\n".join(items), pager=pager)
+
+    def vangogh_collection(self):
+        items = []
+        for index in range(min(self.vangogh_page_size, self.vangogh_items)):
+            item = self.vangogh_item(index)
+            items.append(render(
+                self.templates["vangogh_collection_item"],
+                code=item["objectNumber"],
+                image_url=item["image"]["url"],
+                title=item["title"],
+            ))
+        return render(self.templates["vangogh_collection"], items="\n".join(items), page_size=self.vangogh_page_size)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело уходят отдельными записями; без этого keep-alive
+    # соединение ждёт задержанного ACK (~40 мс) на каждом ответе
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        site = self.server.site
+        faults = site.faults
+        parts = urlparse(self.path)
+        kind = site.kind(parts.path)
+
+        if faults is not None:
+            faults.delay(kind)
+            status = faults.error(kind)
+            if status is not None:
+                body = f"Injected {status}".encode("utf-8")
+                self.send_response(status)
+                if status in (429, 503):
+                    self.send_header("Retry-After", str(faults.retry_after))
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+        status, content_type, body = site.route(parts.path, parse_qs(parts.query))
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        if faults is not None and status == 200 and faults.truncate(kind):
+            # Обрыв соединения посреди тела
+            self.wfile.write(body[: len(body) // 2])
+            self.close_connection = True
+            return
+        if faults is not None and kind == "image" and faults.image_chunk_delay:
+            for start in range(0, len(body), 16384):
+                time.sleep(faults.image_chunk_delay)
+                self.wfile.write(body[start:start + 16384])
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(site=None, host="127.0.0.1", port=0):
+    """Запускает сервер фикстур в фоновом потоке. Адрес - в server.base_url."""
+    site = site or FixtureSite()
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    server.site = site
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    site.base_url = server.base_url
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    return server
+
+
+def add_fault_arguments(parser):
+    """Добавляет в argparse параметры Faults (общие для сервера и benchmark.py)."""
+    group = parser.add_argument_group("сбои")
+    group.add_argument("--latency", help='задержка ответа, мс: "fixed:200", "uniform:50:500", "lognormal:200:0.8"')
+    group.add_argument("--error-rate", type=float, default=0.0, help="вероятность начала серии ошибок")
+    group.add_argument("--burst-length", type=int, default=2, help="длина серии ошибок (запросов)")
+    group.add_argument("--error-statuses", default="429,500,503", help="статусы ошибок через запятую")
+    group.add_argument("--truncate-rate", type=float, default=0.0, help="вероятность оборванного тела")
+    group.add_argument("--image-chunk-delay", type=float, default=0.0, help="пауза перед блоком изображения, с")
+    group.add_argument("--missing-rate", type=float, default=0.0, help="вероятность убрать разделы страницы")
+    group.add_argument("--missing-sections", help="какие разделы убирать, через запятую (по умолчанию все)")
+    group.add_argument("--fault-kinds", default="page,api,image", help="к каким запросам применять сбои")
+    group.add_argument("--seed", type=int, help="seed генератора сбоев для повторяемых прогонов")
+
+
+def faults_from_args(args):
+    """Создаёт Faults из параметров add_fault_arguments или None, если сбои не заданы."""
+    if not (args.latency or args.error_rate or args.truncate_rate or args.image_chunk_delay or args.missing_rate):
+        return None
+    return Faults(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        burst_length=args.burst_length,
+        error_statuses=[int(status) for status in args.error_statuses.split(",")],
+        truncate_rate=args.truncate_rate,
+        image_chunk_delay=args.image_chunk_delay,
+        missing_rate=args.missing_rate,
+        missing_sections=args.missing_sections.split(",") if args.missing_sections else None,
+        kinds=args.fault_kinds.split(","),
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная копия страниц NGA и Van Gogh Museum.")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--nga-items", type=int, default=60)
+    parser.add_argument("--vangogh-items", type=int, default=60)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    site = FixtureSite(args.nga_items, vangogh_items=args.vangogh_items, faults=faults_from_args(args))
+    server = start_server(site, port=args.port)
+    print(f"Сервер фикстур: {server.base_url}")
+    print(f"  NGA_BASE_URL={server.base_url} VANGOGH_BASE_URL={server.base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
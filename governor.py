@@ -0,0 +1,184 @@
+import email.utils
+import ipaddress
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from requests.adapters import BaseAdapter
+
+# Ответы, которые означают, что хост просит сбавить темп
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Переводит заголовок Retry-After (секунды или HTTP-дата) в секунды ожидания."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def host_key(url):
+    """Группирует хосты по домену: www.nga.gov и api.nga.gov делят один лимит."""
+    host = urlparse(url).hostname or ""
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        return ".".join(host.split(".")[-2:])
+
+
+class HostLimiter:
+    """AIMD-ограничитель одновременных запросов к одному хосту.
+
+    Быстрые успешные ответы понемногу увеличивают лимит (примерно на
+    единицу за "окно" из limit запросов), а 429/503, ошибки и ответы
+    медленнее `slow_latency` уменьшают его вдвое. Retry-After приостанавливает
+    выдачу новых слотов до указанного момента.
+    """
+
+    def __init__(self, host, initial=4, minimum=1, maximum=16,
+                 target_latency=2.0, slow_latency=8.0, decrease=0.5):
+        self.host = host
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.slow_latency = slow_latency
+        self.decrease = decrease
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.throttled = 0
+        self.requests = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    self._cond.wait(self.paused_until - now)
+                elif self.in_flight >= int(self.limit):
+                    self._cond.wait(1.0)
+                else:
+                    self.in_flight += 1
+                    return
+
+    def release(self, latency, status=None, error=False, retry_after=None):
+        with self._cond:
+            self.in_flight -= 1
+            self.requests += 1
+
+            if error or status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self._shrink()
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+                    logging.warning(
+                        f"{self.host} просит подождать {retry_after:.0f} с, лимит {int(self.limit)}"
+                    )
+            elif latency > self.slow_latency:
+                self._shrink()
+            elif latency <= self.target_latency:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+            self._cond.notify_all()
+
+    def _shrink(self):
+        self.limit = max(self.minimum, self.limit * self.decrease)
+
+
+class Slot:
+    """Занятый слот запроса: в него записывается результат, который увидит ограничитель."""
+
+    def __init__(self):
+        self.status = None
+        self.error = False
+        self.retry_after = None
+
+    def record(self, status=None, retry_after=None, error=False):
+        self.status = status
+        self.error = error
+        self.retry_after = parse_retry_after(retry_after) if isinstance(retry_after, str) else retry_after
+
+
+class Governor:
+    """Общий для обоих скраперов набор ограничителей по хостам."""
+
+    def __init__(self, **limiter_options):
+        self.limiter_options = limiter_options
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def configure(self, **limiter_options):
+        """Меняет настройки для хостов, ограничители которых ещё не созданы."""
+        self.limiter_options.update(limiter_options)
+
+    def for_url(self, url):
+        key = host_key(url)
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = HostLimiter(key, **self.limiter_options)
+            return self._limiters[key]
+
+    @contextmanager
+    def slot(self, url):
+        """Ждёт свободного слота для хоста URL и отдаёт Slot для записи результата.
+
+        Исключение внутри блока считается ошибкой запроса.
+        """
+        limiter = self.for_url(url)
+        limiter.acquire()
+        slot = Slot()
+        started = time.monotonic()
+        try:
+            yield slot
+        except Exception:
+            slot.error = True
+            raise
+        finally:
+            limiter.release(time.monotonic() - started, slot.status, slot.error, slot.retry_after)
+
+    def summary(self):
+        """Возвращает {хост: {limit, in_flight, requests, throttled}}."""
+        with self._lock:
+            return {
+                key: {
+                    "limit": int(limiter.limit),
+                    "in_flight": limiter.in_flight,
+                    "requests": limiter.requests,
+                    "throttled": limiter.throttled,
+                }
+                for key, limiter in self._limiters.items()
+            }
+
+
+class GovernedAdapter(BaseAdapter):
+    """Транспорт requests, который пропускает каждый запрос через слот Governor."""
+
+    def __init__(self, inner, governor):
+        super().__init__()
+        self.inner = inner
+        self.governor = governor
+
+    def send(self, request, **kwargs):
+        with self.governor.slot(request.url) as slot:
+            response = self.inner.send(request, **kwargs)
+            slot.record(response.status_code, response.headers.get("Retry-After"))
+            return response
+
+    def close(self):
+        self.inner.close()
+
+
+# Общий ограничитель для страниц и изображений обоих скраперов
+governor = Governor()
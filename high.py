@@ -1,24 +1,137 @@
 import sys
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (
-    NoSuchElementException,
-    ElementClickInterceptedException,
+    JavascriptException,
     TimeoutException,
+    WebDriverException,
 )
-from bs4 import BeautifulSoup
-import json
-import requests
 import os
 import re
 import logging
-import time
 import signal
+import queue
+import time
 from selenium.webdriver.common.action_chains import ActionChains
 from concurrent.futures import ThreadPoolExecutor
 
+from changes import ChangeTracker, content_hash, html_hash
+from browser import (
+    DriverPool,
+    compare_blocking_profiles,
+    create_driver,
+    measure_page,
+    page_source,
+    resource_report,
+)
+from downloader import ImageDownloader, download_image
+from governor import governor
+from http_cache import HttpCache
+from http_client import create_session, fetch_html, get_html
+from metrics import MetricsExporter, metrics
+from retry import breakers, is_transient_http_error, retry_call
+from snapshots import SnapshotArchive, reparse
+from storage import CrawlState, JsonLinesWriter, export_json_array, iter_jsonl, url_key
+from waits import wait_stats, wait_until
+from nga_parser import (
+    ACCORDION_SECTIONS,
+    IMAGE_DESCRIPTION_BUTTON,
+    NGA_EXTRACT_SCRIPT,
+    diff_records,
+    extract_artwork_details,
+    parse_detail_page,
+    parse_html,
+    set_parser,
+)
+from parse_pool import ParsePool
+
+# Адрес сайта; переменная окружения NGA_BASE_URL позволяет запустить скрапер
+# на локальной копии страниц (см. fixture_server.py)
+NGA_BASE_URL = os.environ.get("NGA_BASE_URL", "https://www.nga.gov")
+HIGHLIGHTS_URL = f"{NGA_BASE_URL}/collection/highlights.html"
+# Шаблон URL страницы списка с номером больше первого
+HIGHLIGHTS_PAGE_URL = NGA_BASE_URL + "/collection/highlights.html?pageNumber={page}"
+# Сколько страниц списка загружается параллельно
+LISTING_WORKERS = 3
+
+# Количество потоков для детальных страниц и размер пула драйверов
+MAX_WORKERS = 5
+# Через сколько страниц драйвер из пула пересоздаётся
+DRIVER_MAX_PAGES = 50
+# Какие запросы страниц браузер не выполняет (см. browser.BLOCKING_PROFILES):
+# "lean" - картинки, видео, шрифты и сторонняя аналитика; "none" - ничего
+BLOCKING_PROFILE = "lean"
+# Сколько уже обработанных страниц открывает команда blocking-report
+BLOCKING_REPORT_PAGES = 5
+# Начальный и максимальный лимит одновременных запросов к одному хосту
+GOVERNOR_INITIAL = 4
+GOVERNOR_MAX = 16
+# Сколько изображений качается параллельно и сколько из них к одному хосту
+IMAGE_WORKERS = 8
+IMAGE_PER_HOST = 4
+# Режим загрузки детальных страниц:
+#   "auto"    - сначала HTTP без браузера, Selenium только если чего-то не хватает
+#   "http"    - только HTTP, даже если часть разделов отсутствует
+#   "browser" - всегда через Selenium
+DETAIL_MODE = "auto"
+# Как извлекать поля в браузере: "js" - одним скриптом, "python" - парсером page_source
+BROWSER_EXTRACTOR = "js"
+# Сверять результат скрипта с парсером и писать расхождения в лог
+VERIFY_EXTRACTION = False
+# Парсер HTML: "html.parser" или "lxml" (быстрее, нужен пакет lxml)
+HTML_PARSER = "html.parser"
+# Извлечение полей: "soup" - поиском по BeautifulSoup, "spec" - по nga_parser.NGA_FIELDS
+# за один обход дерева lxml (быстрее, нужен пакет lxml)
+HTML_EXTRACTOR = "soup"
+# Сколько процессов разбирают детальные страницы (None - по числу ядер, 0 - разбор в потоках воркеров)
+PARSE_WORKERS = None
+# Верхняя граница ожидания списка произведений в браузере (секунды)
+LISTING_TIMEOUT = 40
+# Сколько секунд скрипт ждёт загрузки страницы и содержимого вкладок
+BROWSER_EXTRACT_TIMEOUT = 10
+# Сколько произведений обход страниц списка может держать в очереди впереди воркеров
+QUEUE_SIZE = 100
+# Результаты: поток JSON Lines и JSON-массив, который собирается из него
+OUTPUT_JSONL = "masterpieces_data_test.jsonl"
+OUTPUT_JSON = "masterpieces_data_test.json"
+# Записи и изображения называются стабильным ключом (nga-<номер объекта>);
+# при экспорте записи дополнительно нумеруются по порядку в списке в поле "id" (None - без номеров)
+EXPORT_ALIAS = "id"
+# Дисковый HTTP-кэш страниц и изображений (None - без кэша) и его предельный размер
+HTTP_CACHE_DIR = ".http_cache"
+HTTP_CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Состояние обхода для продолжения после перезапуска (удалите файл для обхода с нуля)
+STATE_DB = "masterpieces_state.sqlite3"
+# Раз в сколько записей делать fsync файла с результатами
+FSYNC_EVERY = 20
+# Раз в сколько произведений писать прогресс в лог
+LOG_EVERY = 25
+# Метрики этапов: JSON-файл, который обновляется раз в METRICS_INTERVAL секунд,
+# и порт HTTP-сервера с /metrics для Prometheus (None - не запускать)
+METRICS_FILE = "masterpieces_metrics.json"
+METRICS_INTERVAL = 10
+METRICS_PORT = None
+# Архив сжатых снимков детальных страниц для команды reparse (None - не сохранять)
+SNAPSHOT_DIR = "masterpieces_snapshots"
+# Сколько процессов разбирают снимки в reparse (None - по числу ядер)
+REPARSE_WORKERS = None
+# Повторы детальной страницы при временных ошибках и базовая пауза между ними (секунды)
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 2
+# После скольких ошибок подряд запросы к хосту приостанавливаются и на сколько секунд
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30
+# Изображения, которые не скачались и после повторов (для команды retry-dead)
+IMAGE_DEAD_LETTERS = "masterpieces_failed_images.jsonl"
+# Лента изменений инкрементального обхода (команда incremental): added/modified/removed
+CHANGE_FEED = "masterpieces_changes.jsonl"
+
+# Архив снимков, пул процессов разбора и учёт изменений (только в инкрементальном
+# обходе) текущего запуска; создаются в run_scraper
+archive = None
+parse_pool = None
+tracker = None
+
 # Настройка логирования
 logging.basicConfig(
     level=logging.INFO,
@@ -30,26 +143,26 @@ def show_help():
     print("Użycie: python Alexa_v2.py [polecenie]")
     print("Polecenia:")
     print("  run     - Uruchomienie skryptu do scrapowania danych.")
+    print("  export  - Zapisanie zebranych danych JSON Lines jako tablicy JSON.")
+    print("  status  - Wyświetlenie stanu przerwanego lub zakończonego scrapowania.")
+    print("  retry-dead - Ponowienie stron i obrazów, które nie powiodły się po wszystkich próbach.")
+    print("  incremental - Ponowne scrapowanie tylko zmienionych dzieł i zapis listy zmian.")
+    print("  reparse - Ponowne wyodrębnienie danych z archiwum stron bez przeglądarki i sieci.")
+    print("  blocking-report - Porównanie rozmiaru i czasu ładowania stron dla profili blokowania.")
     print("  help    - Wyświetlenie tego komunikatu pomocy.")
 
-def download_image(url, folder, filename):
-    """Скачивает изображение из URL и сохраняет его в указанной папке."""
-    try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-
-        with open(os.path.join(folder, filename), "wb") as file:
-            for chunk in response.iter_content(8192):
-                file.write(chunk)
-        return True
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Ошибка при скачивании изображения {url}: {e}")
-        return False
-
 def scrape_nga_highlights(driver):
     """Скрапит страницу National Gallery of Art Highlights."""
-    html = driver.page_source
-    soup = BeautifulSoup(html, "html.parser")
+    return parse_nga_highlights(page_source(driver))
+
+def parse_nga_highlights(html):
+    """Извлекает список произведений из HTML страницы Highlights.
+
+    Пустой список ul.returns - обычная страница за концом списка (их
+    загружает упреждающий обход walk_listing), поэтому для неё возвращается
+    [] без ошибки в логе; None - если списка на странице нет вовсе.
+    """
+    soup = parse_html(html)
 
     ul_element = soup.find("ul", class_="returns")
     if ul_element is None:
@@ -58,8 +171,8 @@ def scrape_nga_highlights(driver):
 
     li_items = ul_element.find_all("li")
     if not li_items:
-        logging.error("Элементы li не найдены в ul.")
-        return None
+        logging.debug("Элементы li не найдены в ul.")
+        return []
 
     image_data = []
     for li in li_items:
@@ -75,7 +188,7 @@ def scrape_nga_highlights(driver):
 
         a_tag = li.find("a")
         href = a_tag.get("href") if a_tag else None
-        art_object_url = f"https://www.nga.gov{href}" if href else None
+        art_object_url = f"{NGA_BASE_URL}{href}" if href else None
 
         image_data.append(
             {
@@ -86,287 +199,403 @@ def scrape_nga_highlights(driver):
 
     return image_data
 
-def scrape_artwork_details(art_object_url):
+def parse_in_pool(func, html):
+    """Выполняет func(html) в пуле процессов разбора, а без пула - в текущем потоке."""
+    if parse_pool is None:
+        return func(html)
+    return parse_pool.run(func, html)
+
+def scrape_artwork_details(art_object_url, driver_pool=None, mode=DETAIL_MODE, session=None, html=None):
     """Извлекает детальную информацию о произведении искусства из HTML-кода,
-    включая открытие скрытых вкладок."""
-    options = webdriver.ChromeOptions()
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--headless") # Добавляем headless режим
-    
-    driver = webdriver.Chrome(options=options)
-    driver.implicitly_wait(5) # Уменьшаем время ожидания
-
-    driver.get(art_object_url)
-    wait = WebDriverWait(driver, 10) # Уменьшаем время ожидания
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-
-    artwork_data = {}
-
-    def extract_text_or_none(element):
-        """Вспомогательная функция: возвращает текст из элемента или None, если элемента нет."""
-        return element.get_text(strip=True) if element else None
-
-    title_element = soup.select_one("h1.object-title")
-    if title_element:
-        title_text = title_element.get_text(strip=True).replace("\n", " ").replace(
-            "\r", ""
+    включая открытие скрытых вкладок.
+
+    В режимах "auto" и "http" страница сначала скачивается через `session`
+    без браузера (или берётся уже скачанный `html`). Если передан `driver_pool`,
+    драйвер берётся из пула и возвращается в него, иначе для страницы
+    запускается отдельный headless Chrome.
+
+    Страница запрашивается один раз, без повторов: ошибка загрузки
+    пробрасывается (пустая запись затёрла бы прежние данные), а повторы,
+    предохранитель и список "мёртвых писем" остаются за process_artwork.
+    В режиме "auto" браузер открывается, только если в скачанной странице
+    не хватает разделов, а не когда её не удалось загрузить.
+    """
+    if mode in ("auto", "http"):
+        if html is None:
+            html = get_html(art_object_url, session)
+        missing, artwork_data = parse_in_pool(parse_detail_page, html)
+        if not missing or mode == "http":
+            if missing:
+                logging.warning(f"На странице {art_object_url} нет разделов: {', '.join(missing)}")
+            if archive is not None:
+                archive.store(art_object_url, html, "http")
+            return artwork_data
+        logging.info(
+            f"На странице {art_object_url} нет разделов {', '.join(missing)}, открываем в браузере."
         )
-        artwork_data["title"] = re.sub(
-            r",\s*\d{4}(-\d{4})?$", "", title_text
+
+    if driver_pool is not None:
+        with driver_pool.driver() as driver:
+            return _scrape_artwork_details(driver, art_object_url)
+
+    driver = create_driver(headless=True, implicit_wait=5, blocking=BLOCKING_PROFILE)
+    try:
+        return _scrape_artwork_details(driver, art_object_url)
+    finally:
+        driver.quit()
+
+def _expand_and_extract(driver, extract):
+    """Выполняет NGA_EXTRACT_SCRIPT одним запросом к WebDriver."""
+    driver.set_script_timeout(BROWSER_EXTRACT_TIMEOUT + 5)
+    with metrics.timed("accordion_extract_js" if extract else "accordion_expand"):
+        return driver.execute_async_script(
+            NGA_EXTRACT_SCRIPT,
+            [list(pair) for pair in ACCORDION_SECTIONS.items()],
+            IMAGE_DESCRIPTION_BUTTON,
+            BROWSER_EXTRACT_TIMEOUT * 1000,
+            extract,
         )
 
-    artwork_data["name_of_artist"] = extract_text_or_none(soup.select_one("p.attribution"))
-    artwork_data["date:"] = extract_text_or_none(soup.select_one("h1.object-title .date"))
-    artwork_data["on_view"] = extract_text_or_none(soup.select_one("p.onview"))
-    artwork_data["technique:"] = extract_text_or_none(soup.select_one(".object-attr.medium .object-attr-value"))
-    artwork_data["dimensions:"] = extract_text_or_none(soup.select_one(".object-attr.dimensions .object-attr-value"))
-    artwork_data["credit_line"] = extract_text_or_none(soup.select_one(".object-attr.credit .object-attr-value"))
-    artwork_data["accession_number"] = extract_text_or_none(soup.select_one(".object-attr.accession .object-attr-value"))
-    artwork_data["artist_nationality"] = extract_text_or_none(soup.select_one(".object-attr.artists-makers .nationality"))
-    artwork_data["image_use"] = extract_text_or_none(soup.select_one(".object-attr.image-use .object-attr-value"))
-    custom_prints_element = soup.select_one(".object-attr.prints .object-attr-value a")
-    artwork_data["custom_prints_link"] = custom_prints_element["href"] if custom_prints_element else None
-    artwork_data["copyright"] = extract_text_or_none(soup.select_one(".object-attr.copyright .object-attr-value"))
-    artwork_data["signature:"] = None # Добавляем поле "signature:" со значением None
-
-    # Кликаем по кнопкам, чтобы открыть вкладки
-    buttons_to_click = [
-        "accordion-provenance",
-        "accordion-inscription",
-        "accordion-exhibition-history",
-        "accordion-bibliography",
-        "accordion-related-content",
-        "accordion-marks",
-        "accordion-technical"
-    ]
-
-    for button_id in buttons_to_click:
-        try:
-            button = wait.until(EC.presence_of_element_located((By.ID, button_id)))
-            driver.execute_script("arguments[0].click();", button)
-
-        except (NoSuchElementException, TimeoutException, ElementClickInterceptedException) as e:
-            logging.debug(f"Не удалось кликнуть на кнопку {button_id}: {e}")
-
-    # Обновляем soup после кликов по кнопкам
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-
-    # Извлекаем провенанс (Provenance)
-    provenance_text = []
-    provenance_div = soup.find('div', id='provenance')
-    if provenance_div:
-        h3_tag = provenance_div.find('h3', class_='heading-mimic-h6')
-        if h3_tag and h3_tag.get_text(strip=True) == 'Provenance':
-            p_tags = provenance_div.find_all('p')
-            for p in p_tags:
-                provenance_text.append(p.get_text(strip=True))
-
-    # Извлекаем "Associated Names" из раздела "Provenance"
-    associated_names_data = []
-    if provenance_div:
-        # Ищем все теги <a> внутри раздела "Provenance"
-        a_tags = provenance_div.find_all("a", href=True)
-        for a in a_tags:
-            name = a.get_text(strip=True)
-            link = a["href"]
-            if name and link:
-                associated_names_data.append(
-                    {"name": name, "link": f"https://www.nga.gov{link}"}
-                )
+def _scrape_artwork_details(driver, art_object_url):
+    """Скрапит страницу произведения уже открытым драйвером.
+
+    В режиме BROWSER_EXTRACTOR = "js" все вкладки раскрываются и поля
+    извлекаются одним скриптом. Если скрипт не сработал (или выбран режим
+    "python"), поля извлекаются из page_source парсером nga_parser;
+    в режиме "python" вкладки перед этим раскрываются скриптом.
+    """
+    with governor.slot(art_object_url), metrics.timed("driver_get"):
+        driver.get(art_object_url)
+    measure_page(driver)
 
-    artwork_data["provenance"] = provenance_text
-    artwork_data["associated_names"] = associated_names_data
-
-    # Извлекаем подпись (Inscription)
-    inscription_list = []
-    inscription_div = soup.find('div', id='inscription')
-    if inscription_div:
-        h3_tag = inscription_div.find('h3', class_='heading-mimic-h6')
-        if h3_tag and h3_tag.get_text(strip=True) == 'Inscription':
-            p_tags = inscription_div.find_all('p')
-            for p in p_tags:
-                inscription_list.append(p.get_text(strip=True))
-    artwork_data["inscription"] = inscription_list
-
-    # Извлекаем историю выставок (Exhibition History)
-    exhibitions_text = []
-    history_div = soup.find('div', id='history')
-    if history_div:
-        h3_tag = history_div.find('h3', class_='heading-mimic-h6')
-        if h3_tag and h3_tag.get_text(strip=True) == 'Exhibition History':
-            dl_tags = history_div.find_all('dl', class_='year-list')
-            for dl in dl_tags:
-                exhibitions_text.append(re.sub(r'(\d{4})', r'\n\1 ', dl.get_text(strip=True)).strip())
-    artwork_data["exhibitions"] = exhibitions_text
-
-    # Извлекаем библиографию (Bibliography)
-    bibliography_text = []
-    bibliography_div = soup.find('div', id='bibliography')
-    if bibliography_div:
-        h3_tag = bibliography_div.find('h3', class_='heading-mimic-h6')
-        if h3_tag and h3_tag.get_text(strip=True) == 'Bibliography':
-            dl_tags = bibliography_div.find_all('dl', class_='year-list')
-            for dl in dl_tags:
-                bibliography_text.append(re.sub(r'(\d{4})', r'\n\1 ', dl.get_text(strip=True)).strip())
-    artwork_data["bibliography"] = bibliography_text
-
-    # Извлекаем related content
-    related_content_data = []
-    related_content_div = soup.find('div', id='relatedpages')
-    if related_content_div:
-        h3_tag = related_content_div.find('h3', class_='heading-mimic-h6')
-        if h3_tag and h3_tag.get_text(strip=True) == 'Related Content':
-            content_div = related_content_div.find('div', id='tmsRelatedContent')
-            if content_div:
-                links = content_div.find_all('a')
-                for link in links:
-                    related_content_data.append({
-                        "title": link.get_text(strip=True),
-                        "url": f"https://www.nga.gov{link.get('href')}"
-                    })
-    artwork_data["related_content"] = related_content_data
-
-    # Извлекаем описание изображения (image_description)
-    image_description_div = soup.find('div', class_='drawer-alttext')
-    if image_description_div:
-        # Открываем вкладку с описанием изображения, если она есть
+    if BROWSER_EXTRACTOR == "js":
         try:
-            button = wait.until(EC.presence_of_element_located((By.ID, "drawer-control-0")))
-            driver.execute_script("arguments[0].click();", button)
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            image_description_div = soup.find('div', class_='drawer-alttext')  # Ищем заново после обновления
-        except (NoSuchElementException, TimeoutException, ElementClickInterceptedException) as e:
-            logging.debug(f"Не удалось кликнуть на кнопку описания изображения: {e}")
-
-        content_div = image_description_div.find('div', id='drawer-content-0')
-        if content_div:
-            p_tag = content_div.find('p')
-            if p_tag:
-                artwork_data["image_description"] = p_tag.get_text(strip=True)
-            else:
-                artwork_data["image_description"] = None
-        else:
-            artwork_data["image_description"] = None
+            artwork_data = _expand_and_extract(driver, True)
+        except (JavascriptException, TimeoutException) as e:
+            logging.warning(f"Скрипт извлечения не сработал на {art_object_url}: {e}")
+            artwork_data = None
+
+        if artwork_data is not None:
+            html = page_source(driver) if VERIFY_EXTRACTION or archive is not None else None
+            if archive is not None:
+                archive.store(art_object_url, html, "browser")
+            if VERIFY_EXTRACTION:
+                expected = parse_in_pool(extract_artwork_details, html)
+                differences = diff_records(expected, artwork_data)
+                if differences:
+                    logging.warning(
+                        f"Скрипт и парсер расходятся на {art_object_url} в полях: {', '.join(differences)}"
+                    )
+            return artwork_data
+
+        # Скрипт уже ждал заголовок до таймаута (или упал), повторный запуск
+        # для раскрытия вкладок ждал бы его снова - разбираем то, что есть
+        logging.info(f"Извлекаем данные {art_object_url} через парсер.")
     else:
-        artwork_data["image_description"] = None
-
-    # Извлекаем местоположение
-    on_view_text = artwork_data["on_view"]
-    if on_view_text and "Gallery" in on_view_text:
-        match = re.search(r"Gallery (\w+)", on_view_text)
-        if match:
-            artwork_data["location:"] = f"National Gallery of Art, {match.group(0)}"
+        try:
+            _expand_and_extract(driver, False)
+        except (JavascriptException, TimeoutException) as e:
+            logging.debug(f"Не удалось раскрыть вкладки на {art_object_url}: {e}")
+
+    html = page_source(driver)
+    if archive is not None:
+        archive.store(art_object_url, html, "browser")
+    return parse_in_pool(extract_artwork_details, html)
+
+# Номер объекта в URL детальной страницы (/collection/art-object-page.12198.html)
+ART_OBJECT_ID_RE = re.compile(r"art-object-page\.(\d+)")
+
+def artwork_key(art_object_url):
+    """Стабильный ключ произведения: nga-<номер объекта>, а если его нет в URL - хэш URL."""
+    match = ART_OBJECT_ID_RE.search(art_object_url)
+    if match:
+        return f"nga-{match.group(1)}"
+    return url_key(art_object_url, "nga")
+
+def is_transient_error(exc):
+    """Ошибки, после которых детальную страницу стоит запросить ещё раз."""
+    return is_transient_http_error(exc) or isinstance(exc, WebDriverException)
+
+def retry_detail(func, art_object_url):
+    """Вызывает func() с повторами временных ошибок детальной страницы (RETRY_ATTEMPTS раз)."""
+    return retry_call(
+        func,
+        art_object_url,
+        retry_if=is_transient_error,
+        attempts=RETRY_ATTEMPTS,
+        base_delay=RETRY_BASE_DELAY,
+    )
+
+def process_artwork(artwork_info, image_folder, driver_pool=None, session=None, downloader=None):
+    """Скрапит детальную страницу одного произведения и скачивает его изображение.
+
+    Временные ошибки браузера и сети повторяются до RETRY_ATTEMPTS раз
+    (это единственный уровень повторов для детальной страницы);
+    если страница так и не загрузилась, исключение пробрасывается вызывающему.
+    Если передан `downloader`, изображение ставится в его очередь и
+    загружается параллельно, не задерживая поток.
+
+    В инкрементальном обходе (задан `tracker`) страница сначала скачивается
+    для сравнения хэшей: если не изменились ни элемент списка, ни HTML, либо
+    не изменилась извлечённая запись, возвращается None и изображение не
+    загружается повторно.
+    """
+    art_object_url = artwork_info["link_to_the_page_of_the_work"]
+    key = artwork_info["key"]
+    html = listing_hash = page_hash = None
+    if tracker is not None:
+        listing_hash = content_hash([art_object_url, artwork_info.get("image_url")])
+        html = retry_detail(lambda: get_html(art_object_url, session), art_object_url)
+        page_hash = html_hash(html)
+        if tracker.unchanged(key, listing_hash, page_hash):
+            return None
+
+    artwork_details = retry_detail(
+        lambda: scrape_artwork_details(art_object_url, driver_pool, DETAIL_MODE, session, html),
+        art_object_url,
+    )
+    artwork_info.update(artwork_details)
+    blank_to_none(artwork_info)
+
+    image_url = artwork_info.get("image_url")
+    image_filename = f"{key}.jpg"
+    download = bool(image_url)
+    if tracker is not None:
+        change, fields = tracker.record(key, art_object_url, artwork_info, listing_hash, page_hash)
+        if change is None:
+            return None
+        download = download and (
+            change == "added"
+            or "image_url" in fields
+            or not os.path.exists(os.path.join(image_folder, image_filename))
+        )
+
+    if download:
+        if downloader is not None:
+            future = downloader.submit(image_url, image_folder, image_filename)
+            future.add_done_callback(
+                lambda f: _image_done(f.result(), image_folder, image_filename, artwork_info)
+            )
         else:
-            artwork_data["location:"] = on_view_text
+            _image_done(
+                download_image(image_url, image_folder, image_filename, session),
+                image_folder, image_filename, artwork_info,
+            )
+
+    return artwork_info
+
+def blank_to_none(artwork_info):
+    """Заменяет пустые строки в записи на None."""
+    for key, value in artwork_info.items():
+        if value == '':
+            artwork_info[key] = None
+
+def _image_done(downloaded, image_folder, image_filename, artwork_info):
+    if downloaded:
+        logging.info(f"Скачано изображение {image_filename}")
+        if tracker is not None:
+            tracker.image(
+                artwork_info["key"],
+                artwork_info["link_to_the_page_of_the_work"],
+                os.path.join(image_folder, image_filename),
+            )
     else:
-      artwork_data["location:"] = None
-
-    # Извлекаем информацию об артисте
-    artist_info_div = soup.find('div', id='accordion-artists-makers')
-    if artist_info_div:
-        artist_name_element = artist_info_div.find('h3', class_='heading-mimic-h6')
-        artist_name = artist_name_element.get_text(strip=True) if artist_name_element else None
-        if artist_name:
-            artwork_data['artist_name'] = artist_name
-
-        # Извлекаем даты рождения и смерти артиста
-        birth_date_element = artist_info_div.find('span', class_='birth')
-        death_date_element = artist_info_div.find('span', class_='death')
-        artwork_data['artist_birth_date'] = birth_date_element.get_text(strip=True) if birth_date_element else None
-        artwork_data['artist_death_date'] = death_date_element.get_text(strip=True) if death_date_element else None
-
-    # Извлекаем дату приобретения
-    acquisition_div = soup.find('div', id='accordion-acquisition')
-    if acquisition_div:
-        acquisition_date_element = acquisition_div.find('span', class_='acquisition-date')
-        artwork_data['acquisition_date'] = acquisition_date_element.get_text(strip=True) if acquisition_date_element else None
-
-    # Извлекаем "Marks and Labels"
-    marks_and_labels_list = []
-    marks_and_labels_div = soup.find('div', id='marks')
-    if marks_and_labels_div:
-        h3_tag = marks_and_labels_div.find('h3', class_='heading-mimic-h6')
-        if h3_tag and h3_tag.get_text(strip=True) == 'Marks and Labels':
-            p_tags = marks_and_labels_div.find_all('p')
-            for p in p_tags:
-                marks_and_labels_list.append(p.get_text(strip=True))
-    artwork_data["marks_and_labels"] = marks_and_labels_list
-    
-    # Извлекаем "Technical Summary"
-    technical_summary_list = []
-    technical_summary_div = soup.find('div', id='technical')
-    if technical_summary_div:
-        h3_tag = technical_summary_div.find('h3', class_='heading-mimic-h6')
-        if h3_tag and h3_tag.get_text(strip=True) == 'Technical Summary':
-            p_tags = technical_summary_div.find_all('p')
-            for p in p_tags:
-                technical_summary_list.append(p.get_text(strip=True))
-    artwork_data["technical_summary"] = technical_summary_list
-
-    driver.quit()
-    return artwork_data
-
-def scrape_page(driver, page_num, artwork_counter, image_folder, max_workers=5):
-    """Скрапит отдельную страницу и возвращает список произведений искусства."""
+        logging.error(f"Не удалось скачать изображение для произведения {artwork_info['key']}")
+
+def listing_artworks(scraped_data, page_num, state=None, retry_dead=False):
+    """Собирает записи произведений со страницы списка.
+
+    Каждая запись получает стабильный ключ (см. artwork_key) и позицию
+    [страница, номер на странице], по которой записи упорядочиваются при
+    экспорте, поэтому страницы и произведения можно обрабатывать в любом
+    порядке. С `state` (CrawlState) уже обработанные в прошлых запусках
+    произведения пропускаются (кроме инкрементального обхода, где их
+    изменения проверяет `tracker`), как и "мёртвые письма", если не задан
+    `retry_dead`. Возвращает записи, у которых есть ссылка на детальную страницу.
+    """
+    skipped = set()
+    if tracker is None:
+        skipped.add(CrawlState.DONE)
+    if not retry_dead:
+        skipped.add(CrawlState.DEAD)
+    artworks = []
+    for index, item in enumerate(scraped_data):
+        art_object_url = item.get("link_to_the_page_of_the_work")
+        if not art_object_url:
+            continue
+        key = artwork_key(art_object_url)
+        if tracker is not None:
+            tracker.seen(key, art_object_url)
+        if state is not None and state.status(art_object_url) in skipped:
+            continue
+        artworks.append(
+            {
+                "key": key,
+                "link_to_the_page_of_the_work": art_object_url,
+                "image_url": item.get("image_url"),
+                "listing_position": [page_num, index],
+            }
+        )
+    return artworks
+
+def scrape_page(driver, page_num, image_folder, max_workers=5, driver_pool=None, session=None):
+    """Скрапит отдельную страницу и возвращает список произведений искусства.
+
+    Детальные страницы загружаются через общую `session` или открываются
+    драйверами из `driver_pool` (см. DETAIL_MODE). Произведение, которое не
+    удалось обработать, пропускается, не прерывая остальную страницу.
+    """
     logging.info(f"Обработка страницы {page_num}...")
-    wait = WebDriverWait(driver, 40)
 
     try:
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "ul.returns")))
+        if not wait_until(
+            driver,
+            EC.presence_of_element_located((By.CSS_SELECTOR, "ul.returns")),
+            LISTING_TIMEOUT,
+            "listing_page",
+        ):
+            logging.error(f"Список произведений на странице {page_num} не загрузился.")
+            return []
         scraped_data = scrape_nga_highlights(driver)
 
         if not scraped_data:
             logging.warning("Не удалось получить данные со страницы.")
-            return [], artwork_counter
+            return []
 
-        page_artworks = []
+        artworks = listing_artworks(scraped_data, page_num)
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for item in scraped_data:
-                artwork_info = {
-                    "id": artwork_counter,
-                    "link_to_the_page_of_the_work": item.get("link_to_the_page_of_the_work"),
-                    "image_url": item.get("image_url"),
-                }
-
-                if item["link_to_the_page_of_the_work"]:
-                    future = executor.submit(scrape_artwork_details, item["link_to_the_page_of_the_work"])
-                    futures.append((future, artwork_info, item.get("image_url")))
-
-                artwork_counter += 1
-
-            for future, artwork_info, image_url in futures:
-                try:
-                    artwork_details = future.result()
-                    artwork_info.update(artwork_details)
-
-                    # Заменяем пустые значения на None, а пустые списки на []
-                    for key, value in artwork_info.items():
-                        if value == '':
-                            artwork_info[key] = None
-
-                except requests.exceptions.RequestException as e:
-                    logging.error(
-                        f"Ошибка при запросе страницы {artwork_info['link_to_the_page_of_the_work']}: {e}"
-                    )
+            futures = [
+                executor.submit(process_artwork, artwork_info, image_folder, driver_pool, session)
+                for artwork_info in artworks
+            ]
 
-                page_artworks.append(artwork_info)
-
-                if image_url:
-                    image_filename = f"{artwork_info['id']}.jpg"
-                    if download_image(image_url, image_folder, image_filename):
-                        logging.info(
-                            f"Скачано изображение {image_filename} со страницы {page_num}"
-                        )
-                    else:
-                        logging.error(f"Не удалось скачать изображение для произведения с ID {artwork_info['id']}")
+        page_artworks = []
+        for artwork_info, future in zip(artworks, futures):
+            try:
+                page_artworks.append(future.result())
+            except Exception as e:
+                logging.error(
+                    f"Ошибка при обработке {artwork_info['link_to_the_page_of_the_work']}: {e}"
+                )
 
-        return page_artworks, artwork_counter
+        return page_artworks
 
     except Exception as e:
         logging.error(f"Произошла ошибка на странице {page_num}: {e}")
-        return [], artwork_counter
+        return []
+
+# Открывающий тег списка произведений <ul class="returns"> в сыром HTML
+RETURNS_LIST_RE = re.compile(r"<ul[^>]*class=[\"'][^\"']*\breturns\b")
+
+def highlights_page_url(page_num):
+    """Строит URL страницы списка Highlights по её номеру."""
+    if page_num == 1:
+        return HIGHLIGHTS_URL
+    return HIGHLIGHTS_PAGE_URL.format(page=page_num)
+
+def fetch_listing_page(page_num, session=None, driver_pool=None):
+    """Загружает страницу списка по URL и возвращает её произведения.
+
+    Страница скачивается через HTTP, а если список в разметке не найден
+    (или DETAIL_MODE = "browser"), открывается драйвером из пула.
+    Пустой список означает, что страница загрузилась, но произведений на
+    ней нет (список закончился); None - что страницу загрузить не удалось.
+    """
+    url = highlights_page_url(page_num)
+    if DETAIL_MODE != "browser":
+        html = fetch_html(url, session)
+        if html and RETURNS_LIST_RE.search(html):
+            return parse_nga_highlights(html) or []
+        logging.info(f"Список на странице {page_num} не найден в HTML, открываем в браузере.")
+
+    if driver_pool is None:
+        return None
+    with driver_pool.driver() as driver:
+        with governor.slot(url), metrics.timed("driver_get"):
+            driver.get(url)
+        if not wait_until(
+            driver,
+            EC.presence_of_element_located((By.CSS_SELECTOR, "ul.returns")),
+            LISTING_TIMEOUT,
+            "listing_page",
+        ):
+            logging.error(f"Список произведений на странице {page_num} не загрузился.")
+            return None
+        return scrape_nga_highlights(driver) or []
+
+def walk_listing(max_pages, artwork_queue, session=None, driver_pool=None, state=None, retry_dead=False):
+    """Продюсер: загружает страницы списка и кладёт произведения в очередь.
+
+    Страницы загружаются параллельно (LISTING_WORKERS потоков, не дальше чем
+    на LISTING_WORKERS страниц вперёд) и разбираются по порядку номеров до
+    первой успешно загруженной пустой страницы. Страница, которую загрузить
+    не удалось, пропускается и не считается концом списка. Очередь
+    ограничена, поэтому обход идёт не дальше чем на QUEUE_SIZE произведений
+    впереди детальных воркеров. Возвращает номера страниц, которые загрузить
+    не удалось.
+    """
+    failed_pages = []
+    executor = ThreadPoolExecutor(max_workers=LISTING_WORKERS)
+    try:
+        pending = {}
+        next_page = 1
+        for page_num in range(1, max_pages + 1):
+            while next_page <= max_pages and len(pending) < LISTING_WORKERS:
+                pending[next_page] = executor.submit(fetch_listing_page, next_page, session, driver_pool)
+                next_page += 1
+            if not running:
+                break
+            try:
+                scraped_data = pending.pop(page_num).result()
+            except Exception as e:
+                logging.error(f"Ошибка при загрузке страницы списка {page_num}: {e}")
+                scraped_data = None
+            if scraped_data is None:
+                logging.warning(f"Страницу {page_num} загрузить не удалось, она пропущена.")
+                failed_pages.append(page_num)
+                continue
+            if not scraped_data:
+                logging.info(f"Страница {page_num} пуста, обход списка завершён.")
+                break
+            artworks = listing_artworks(scraped_data, page_num, state, retry_dead)
+            for artwork_info in artworks:
+                artwork_queue.put(artwork_info)
+            logging.info(f"Страница {page_num}: в очередь добавлено {len(artworks)} произведений")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return failed_pages
+
+def detail_worker(artwork_queue, results, image_folder, driver_pool, session, downloader=None, state=None):
+    """Консьюмер: забирает произведения из очереди, пока не встретит None.
+
+    Попытки отмечаются в `state`; произведение, которое не удалось
+    обработать и после повторов, попадает в список "мёртвых писем".
+    Успешной обработка считается после записи результата (см. run_scraper).
+    """
+    try:
+        while True:
+            artwork_info = artwork_queue.get()
+            if artwork_info is None:
+                break
+            if not running:
+                continue
+            art_object_url = artwork_info["link_to_the_page_of_the_work"]
+            if state is not None:
+                state.mark_started(art_object_url)
+            try:
+                artwork_info = process_artwork(artwork_info, image_folder, driver_pool, session, downloader)
+                if artwork_info is not None:
+                    results.put(artwork_info)
+                elif state is not None:
+                    # Инкрементальный обход: произведение не изменилось, запись не нужна
+                    state.mark_done(art_object_url, OUTPUT_JSONL)
+            except Exception as e:
+                logging.error(f"Ошибка при обработке {art_object_url}: {e}")
+                if state is not None:
+                    state.mark_dead(art_object_url, e)
+    finally:
+        results.put(None)
 
 def signal_handler(signum, frame):
     """Обработчик сигнала для прерывания цикла."""
@@ -374,94 +603,232 @@ def signal_handler(signum, frame):
     running = False
     logging.info("Прерывание выполнения по сигналу (Ctrl+C). Завершение...")
 
-def run_scraper():
-    """Основная функция для запуска скрапинга."""
-    global running
+def export_results():
+    """Собирает JSON Lines с результатами в JSON-массив прежнего формата.
+
+    Записи упорядочиваются по позиции в списке и нумеруются в поле EXPORT_ALIAS.
+    Записи прошлых версий без ключа и позиции идут первыми в порядке старых ID.
+    """
+    count = export_json_array(
+        OUTPUT_JSONL,
+        OUTPUT_JSON,
+        sort_key=lambda a: a.get("listing_position") or [0, a.get("id", 0)],
+        unique_key=lambda a: artwork_key(a["link_to_the_page_of_the_work"]),
+        alias=EXPORT_ALIAS,
+    )
+    logging.info(f"Экспортировано {count} произведений в {OUTPUT_JSON}")
+
+def show_status():
+    """Выводит количество URL в каждом статусе и список "мёртвых писем"."""
+    state = CrawlState(STATE_DB)
+    for status, count in sorted(state.counts().items()):
+        print(f"  {status}: {count}")
+    for url, attempts, error in state.dead_letters():
+        print(f"  [dead] {url} (попыток: {attempts}): {error}")
+    state.close()
+
+    failed_images = list(iter_jsonl(IMAGE_DEAD_LETTERS))
+    if failed_images:
+        print(f"  Не скачано изображений: {len(failed_images)} (см. {IMAGE_DEAD_LETTERS})")
+
+# Поля записи, которые берутся со страницы списка, а не с детальной страницы
+LISTING_FIELDS = ("key", "link_to_the_page_of_the_work", "image_url", "listing_position")
+
+def reparse_snapshots():
+    """Заново извлекает поля всех произведений из архива снимков, без браузера и сети.
+
+    Поля детальной страницы в OUTPUT_JSONL заменяются результатом разбора
+    последнего снимка; ключ, позиция и ссылка на изображение сохраняются. Затем
+    результаты заново экспортируются в OUTPUT_JSON.
+    """
+    snapshot_archive = SnapshotArchive(SNAPSHOT_DIR)
+    started = time.monotonic()
+    details = reparse(snapshot_archive, extract_artwork_details, REPARSE_WORKERS, set_parser, (HTML_PARSER, HTML_EXTRACTOR))
+    snapshot_archive.close()
+    logging.info(f"Разобрано {len(details)} снимков за {time.monotonic() - started:.1f} с")
+
+    records = {record["link_to_the_page_of_the_work"]: record for record in iter_jsonl(OUTPUT_JSONL)}
+    updated = 0
+    temp_path = OUTPUT_JSONL + ".part"
+    with JsonLinesWriter(temp_path, fsync_every=1000, mode="w") as writer:
+        for url, record in records.items():
+            if url in details and not record.get("removed"):
+                artwork_info = {
+                    key: record[key] for key in LISTING_FIELDS if key in record
+                }
+                artwork_info.update(details[url])
+                blank_to_none(artwork_info)
+                record = artwork_info
+                updated += 1
+            writer.write(record)
+    os.replace(temp_path, OUTPUT_JSONL)
+    logging.info(f"Обновлено {updated} из {len(records)} записей в {OUTPUT_JSONL}")
+    export_results()
+
+def show_blocking_report():
+    """Открывает несколько обработанных страниц с каждым профилем блокировки и выводит сравнение."""
+    state = CrawlState(STATE_DB)
+    urls = state.urls(CrawlState.DONE)[:BLOCKING_REPORT_PAGES]
+    state.close()
+    if not urls:
+        urls = [HIGHLIGHTS_URL]
+
+    for profile, row in compare_blocking_profiles(urls).items():
+        saved = ""
+        if "saved_kb" in row:
+            saved = f", экономия {row['saved_kb']} КБ и {row.get('saved_ms')} мс на страницу"
+        print(
+            f"  {profile}: {row['kb_per_page']} КБ, {row['requests_per_page']} запросов, "
+            f"загрузка {row['load_ms']} мс{saved}"
+        )
+
+def pop_dead_images():
+    """Забирает список не скачанных изображений и удаляет файл.
+
+    Изображения, которые снова не скачаются, downloader запишет в него заново.
+    """
+    failed_images = list(iter_jsonl(IMAGE_DEAD_LETTERS))
+    if os.path.exists(IMAGE_DEAD_LETTERS):
+        os.remove(IMAGE_DEAD_LETTERS)
+    return failed_images
+
+def run_scraper(retry_dead=False, incremental=False):
+    """Основная функция для запуска скрапинга.
+
+    С `retry_dead` обход заново обрабатывает страницы и изображения,
+    которые в прошлых запусках не удались и после всех повторов.
+    С `incremental` заново проверяются и уже обработанные произведения:
+    разбираются только изменившиеся страницы, в OUTPUT_JSONL дописываются
+    только изменившиеся записи, а изменения пишутся в CHANGE_FEED.
+    """
+    global running, archive, parse_pool, tracker
     running = True
     signal.signal(signal.SIGINT, signal_handler)
 
-    highlights_url = "https://www.nga.gov/collection/highlights.html"
     max_pages = 10  # Указываем максимальное количество страниц
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    # options.add_argument("--headless") # Раскомментируйте, если нужен headless режим для основного драйвера
-
-    driver = webdriver.Chrome(options=options)
-    driver.implicitly_wait(10)
-    driver.get(highlights_url)
-    time.sleep(2)  # Уменьшаем начальную паузу
-    wait = WebDriverWait(driver, 20)
-
-    all_artworks = []
-    page_num = 1
-    artwork_counter = 1
     image_folder = "masterpieces"
 
     if not os.path.exists(image_folder):
         os.makedirs(image_folder)
 
-    while running and page_num <= max_pages:
-        page_artworks, artwork_counter = scrape_page(
-            driver, page_num, artwork_counter, image_folder
-        )
-        all_artworks.extend(page_artworks)
-
-        with open("masterpieces_data_test.json", "w", encoding="utf-8") as json_file:
-            json.dump(all_artworks, json_file, indent=4, ensure_ascii=False)
-        logging.info(f"Данные со страницы {page_num} добавлены в masterpieces_data.json")
-
-        # Переход на следующую страницу
-        if page_num < max_pages:
+    # Состояние обхода: обработанные в прошлых запусках произведения пропускаются
+    state = CrawlState(STATE_DB)
+    counts = state.counts()
+    if counts:
+        logging.info(f"Продолжение обхода, состояние в {STATE_DB}: {counts}")
+    if retry_dead:
+        logging.info(f"Повторная обработка \"мёртвых писем\": {len(state.dead_letters())} страниц")
+    # Хэши содержимого и лента изменений инкрементального обхода
+    tracker = ChangeTracker(state, CHANGE_FEED, ignored_fields=("listing_position",)) if incremental else None
+
+    # Записи дописываются в JSON Lines по мере готовности, JSON-массив собирается в конце
+    writer = JsonLinesWriter(OUTPUT_JSONL, fsync_every=FSYNC_EVERY, mode="a")
+
+    # Пул headless-драйверов для страниц списка и детальных страниц
+    driver_pool = DriverPool(size=MAX_WORKERS, max_pages=DRIVER_MAX_PAGES, blocking=BLOCKING_PROFILE)
+    # Общая keep-alive сессия для загрузки страниц и изображений без браузера,
+    # ответы кэшируются на диске и при повторном обходе перепроверяются условными запросами
+    cache = HttpCache(HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES) if HTTP_CACHE_DIR else None
+    # Одновременные запросы к каждому хосту (страницы и изображения вместе)
+    # регулирует общий governor: растут, пока хост отвечает быстро, и
+    # сокращаются при 429/503, ошибках и Retry-After
+    governor.configure(initial=GOVERNOR_INITIAL, maximum=GOVERNOR_MAX)
+    # Хост, который раз за разом отвечает ошибками, на время перестаёт получать запросы
+    breakers.configure(failure_threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET)
+    session = create_session(
+        pool_size=MAX_WORKERS + LISTING_WORKERS + IMAGE_WORKERS, cache=cache, governor=governor
+    )
+
+    # Длительности этапов (запуск драйвера, driver.get, вкладки, разбор, изображения,
+    # запись) периодически сохраняются в METRICS_FILE и отдаются на METRICS_PORT
+    exporter = MetricsExporter(METRICS_FILE, METRICS_INTERVAL, METRICS_PORT)
+
+    # Снимки детальных страниц для повторного разбора без обхода (команда reparse)
+    archive = SnapshotArchive(SNAPSHOT_DIR) if SNAPSHOT_DIR else None
+    # Детальные страницы разбираются в отдельных процессах, чтобы разбор не
+    # делил GIL с потоками, которые управляют браузерами и ждут сеть
+    parse_pool = ParsePool(PARSE_WORKERS, HTML_PARSER, HTML_EXTRACTOR)
+
+    # Изображения качаются отдельным пулом, параллельно с детальными страницами;
+    # не скачавшиеся и после повторов записываются в IMAGE_DEAD_LETTERS
+    failed_images = pop_dead_images() if retry_dead else []
+    image_dead_letters = JsonLinesWriter(IMAGE_DEAD_LETTERS, fsync_every=1, mode="a")
+    downloader = ImageDownloader(
+        session, max_workers=IMAGE_WORKERS, per_host=IMAGE_PER_HOST, dead_letters=image_dead_letters
+    )
+    for entry in failed_images:
+        downloader.submit(entry["url"], entry["folder"], entry["filename"])
+    if failed_images:
+        logging.info(f"Повторная загрузка изображений: {len(failed_images)}")
+
+    # Страницы списка обходятся заранее в ограниченную очередь, из которой
+    # детальные воркеры забирают произведения без простоя на границах страниц
+    artwork_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    results = queue.Queue()
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS + 1) as executor:
+        workers = [
+            executor.submit(
+                detail_worker, artwork_queue, results, image_folder, driver_pool, session, downloader, state
+            )
+            for _ in range(MAX_WORKERS)
+        ]
+
+        def produce():
             try:
-                # Ожидание появления списка
-                wait = WebDriverWait(driver, 10)
-                wait.until(
-                    EC.presence_of_element_located((By.XPATH, "/html/body/div[2]/div[1]/div[2]/div/div/div/div[3]/div/div/div[5]/div/ul"))
-                )
-                # Находим кнопку "Next" *после* загрузки страницы
-                next_button_xpath = "/html/body/div[2]/div[1]/div[2]/div/div/div/div[3]/div/div/div[5]/div/ul/li[4]/a/span"  # poprawiony xpath
-                next_button = wait.until(
-                    EC.element_to_be_clickable((By.XPATH, next_button_xpath))
-                )
-
-                # Запоминаем текущий URL перед кликом, чтобы потом сравнить
-                current_url = driver.current_url
-
-                # Клик по кнопке "Next" с помощью JavaScript
-                driver.execute_script("arguments[0].click();", next_button)
-                # Ожидание обновления URL (zmiany strony)
-                wait.until(lambda driver: driver.current_url != current_url) 
-
-            except TimeoutException:
-                print(f"Не удалось найти кнопку 'Next' на странице {page_num + 1} или не произошло переключение страницы.")
-                break
-
-                # Ожидание обновления списка результатов
-                def list_updated(driver):
-                    new_list = driver.find_elements(By.CSS_SELECTOR, "ul.returns li")
-                    return len(new_list) > 0 and len(new_list) != initial_list_count
-
-                initial_list_count = len(driver.find_elements(By.CSS_SELECTOR, "ul.returns li"))
-                wait.until(list_updated)
-
-                page_num += 1
-                time.sleep(1)
-
-            except NoSuchElementException:
-                logging.info("Кнопка 'next' не найдена. Завершение.")
-                break
-            except TimeoutException:
-                logging.error(
-                    "Превышено время ожидания загрузки следующей страницы."
-                )
-                break
-        else:
-            logging.info("Достигнута последняя страница.")
-            break
-
-    driver.quit()
+                return walk_listing(max_pages, artwork_queue, session, driver_pool, state, retry_dead)
+            finally:
+                for _ in workers:
+                    artwork_queue.put(None)
+
+        producer = executor.submit(produce)
+
+        finished_workers = 0
+        while finished_workers < len(workers):
+            artwork_info = results.get()
+            if artwork_info is None:
+                finished_workers += 1
+                continue
+            writer.write(artwork_info)
+            state.mark_done(artwork_info["link_to_the_page_of_the_work"], OUTPUT_JSONL)
+            if writer.count % LOG_EVERY == 0:
+                logging.info(f"Собрано {writer.count} произведений, данные дописываются в {OUTPUT_JSONL}")
+
+        # Исчезнувшими считаются только произведения списка, пройденного без сбоев
+        listing_complete = running
+        try:
+            failed_pages = producer.result()
+            if failed_pages:
+                listing_complete = False
+                logging.warning(f"Не загрузились страницы списка: {failed_pages}")
+        except Exception as e:
+            listing_complete = False
+            logging.error(f"Ошибка при обходе страниц списка: {e}")
+
+    downloader.close()
+    image_dead_letters.close()
+    if tracker is not None:
+        # Произведения, исчезнувшие из списка, исключаются из экспорта записью {"removed": true}
+        for key, url in tracker.finish(complete=listing_complete):
+            writer.write({"key": key, "link_to_the_page_of_the_work": url, "removed": True})
+        logging.info(f"Изменения ({CHANGE_FEED}): {tracker.counts}")
+    writer.close()
+    logging.info(f"Собрано {writer.count} произведений, данные сохранены в {OUTPUT_JSONL}")
+    logging.info(f"Состояние обхода: {state.counts()}")
+    logging.info(f"Ожидания (секунды): {wait_stats.summary()}")
+    logging.info(f"Лимиты запросов по хостам: {governor.summary()}")
+    logging.info(f"Загрузка страниц в браузере: {resource_report.summary()}")
+    exporter.close()
+    logging.info(f"Метрики этапов сохранены в {METRICS_FILE}")
+    if archive is not None:
+        archive.close()
+    parse_pool.close()
+    state.close()
+    export_results()
+
+    driver_pool.close()
+    session.close()
     logging.info("Завершено.")
 
 if __name__ == "__main__":
@@ -471,6 +838,18 @@ if __name__ == "__main__":
             show_help()
         elif command == "run":
             run_scraper()
+        elif command == "export":
+            export_results()
+        elif command == "status":
+            show_status()
+        elif command == "retry-dead":
+            run_scraper(retry_dead=True)
+        elif command == "incremental":
+            run_scraper(incremental=True)
+        elif command == "reparse":
+            reparse_snapshots()
+        elif command == "blocking-report":
+            show_blocking_report()
         else:
             print("Неизвестная команда.")
             show_help()
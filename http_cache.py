@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Заголовки ответа, которые сохраняются вместе с телом
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class HttpCache:
+    """Дисковый кэш HTTP-ответов с ключом по URL.
+
+    Для каждого URL хранится тело (`<sha256>.body`) и метаданные с
+    валидаторами ETag/Last-Modified (`<sha256>.json`). Общий размер
+    ограничен `max_bytes`: при превышении удаляются записи, к которым
+    дольше всего не обращались (время обращения - mtime файла тела).
+    """
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total = sum(size for _, size, _ in self._entries())
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        folder = os.path.join(self.directory, key[:2])
+        return os.path.join(folder, key + ".body"), os.path.join(folder, key + ".json")
+
+    def _entries(self):
+        """Перебирает записи кэша: (путь к телу, размер, время последнего обращения)."""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".body"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def lookup(self, url):
+        """Возвращает (метаданные, тело) для URL или None, если записи нет."""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as file:
+                meta = json.load(file)
+            with open(body_path, "rb") as file:
+                body = file.read()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return meta, body
+
+    def touch(self, url):
+        """Отмечает обращение к записи (для LRU)."""
+        body_path, _ = self._paths(url)
+        try:
+            os.utime(body_path)
+        except FileNotFoundError:
+            pass
+
+    def store(self, url, headers, body):
+        """Сохраняет тело и валидаторы ответа, затем при необходимости вытесняет старые записи."""
+        body_path, meta_path = self._paths(url)
+        folder = os.path.dirname(body_path)
+        os.makedirs(folder, exist_ok=True)
+        meta = {
+            "url": url,
+            "stored_at": time.time(),
+            "headers": {name: headers[name] for name in STORED_HEADERS if name in headers},
+        }
+
+        with self._lock:
+            try:
+                old_size = os.path.getsize(body_path)
+            except FileNotFoundError:
+                old_size = 0
+            for path, data in ((body_path, body), (meta_path, json.dumps(meta).encode("utf-8"))):
+                with tempfile.NamedTemporaryFile(dir=folder, delete=False) as file:
+                    file.write(data)
+                os.replace(file.name, path)
+            self._total += len(body) - old_size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Удаляет самые давно использованные записи, пока кэш не станет меньше 90% лимита."""
+        target = self.max_bytes * 0.9
+        for body_path, size, _ in sorted(self._entries(), key=lambda entry: entry[2]):
+            if self._total <= target:
+                break
+            for path in (body_path, body_path[: -len(".body")] + ".json"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._total -= size
+        logging.debug(f"HTTP-кэш очищен до {self._total} байт")
+
+
+class CachingAdapter(HTTPAdapter):
+    """Транспорт requests, который отвечает из HttpCache с условной перепроверкой.
+
+    Для закэшированного URL GET-запрос уходит с If-None-Match/If-Modified-Since;
+    ответ 304 заменяется сохранённым телом со статусом 200. Ответы 200 с ETag
+    или Last-Modified сохраняются. У ответа из кэша атрибут `from_cache` = True.
+    """
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+
+        url = request.url
+        cached = self.cache.lookup(url)
+        if cached is not None:
+            meta, body = cached
+            stored = meta.get("headers", {})
+            if "ETag" in stored:
+                request.headers["If-None-Match"] = stored["ETag"]
+            if "Last-Modified" in stored:
+                request.headers["If-Modified-Since"] = stored["Last-Modified"]
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            self.cache.touch(url)
+            return self._cached_response(request, response, meta, body)
+
+        if response.status_code == 200 and (
+            "ETag" in response.headers or "Last-Modified" in response.headers
+        ):
+            body = response.content
+            self.cache.store(url, response.headers, body)
+        response.from_cache = False
+        return response
+
+    @staticmethod
+    def _cached_response(request, not_modified, meta, body):
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = request.url
+        response.request = request
+        response.connection = not_modified.connection
+        response.elapsed = not_modified.elapsed
+        response.headers = CaseInsensitiveDict(meta.get("headers", {}))
+        response.headers.update(
+            {name: not_modified.headers[name] for name in STORED_HEADERS if name in not_modified.headers}
+        )
+        response.headers["Content-Length"] = str(len(body))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
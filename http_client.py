@@ -0,0 +1,88 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from governor import GovernedAdapter, governor as shared_governor
+from http_cache import CachingAdapter
+from metrics import metrics
+from retry import CircuitOpenError, retry_call
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_size=10, cache=None, governor=None):
+    """Создаёт сессию requests с keep-alive пулом соединений на хост.
+
+    Если передан `cache` (HttpCache), все GET-запросы сессии идут через
+    него с условной перепроверкой. Если передан `governor` (Governor),
+    число одновременных запросов к каждому хосту подстраивается под его ответы.
+    """
+    session = requests.Session()
+    if cache is not None:
+        adapter = CachingAdapter(cache, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    if governor is not None:
+        adapter = GovernedAdapter(adapter, governor)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT})
+    return session
+
+
+def get_session():
+    """Возвращает общую для всех потоков сессию (создаётся при первом вызове)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session(governor=shared_governor)
+        return _session
+
+
+def get_html(url, session=None, timeout=30):
+    """Один запрос HTML страницы без повторов. Ошибки сети и ответы 4xx/5xx
+    пробрасываются (requests.exceptions.RequestException), чтобы вызывающий
+    сам решал, повторять ли запрос (см. retry.retry_call)."""
+    session = session or get_session()
+    with metrics.timed("http_get"):
+        response = session.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.text
+
+
+def fetch_html(url, session=None, timeout=30, attempts=3):
+    """Скачивает HTML страницы без браузера. Возвращает текст или None при ошибке.
+
+    Сетевые ошибки, таймауты и ответы 429/5xx повторяются до `attempts`
+    раз с экспоненциальной паузой (см. retry.retry_call).
+    """
+    try:
+        return retry_call(lambda: get_html(url, session, timeout), url, attempts=attempts)
+    except (requests.exceptions.RequestException, CircuitOpenError) as e:
+        logging.warning(f"Не удалось загрузить страницу {url}: {e}")
+        return None
+
+
+def fetch_json(url, session=None, timeout=30, attempts=3):
+    """Запрашивает JSON (например, API сайта). Возвращает разобранные данные или None при ошибке."""
+    session = session or get_session()
+
+    def get():
+        response = session.get(url, timeout=timeout, headers={"Accept": "application/json"})
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        with metrics.timed("http_get"):
+            return retry_call(get, url, attempts=attempts)
+    except (requests.exceptions.RequestException, CircuitOpenError, ValueError) as e:
+        logging.warning(f"Не удалось загрузить JSON {url}: {e}")
+        return None
@@ -0,0 +1,63 @@
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# Параметры запроса, которыми API обычно задают номер страницы или смещение
+PAGE_PARAMS = ("page", "pagenumber", "pageindex", "p")
+OFFSET_PARAMS = ("from", "offset", "start", "skip")
+
+
+def iter_dicts(data):
+    """Перебирает все словари во вложенной структуре JSON (сначала вложенные)."""
+    if isinstance(data, dict):
+        for value in data.values():
+            yield from iter_dicts(value)
+        yield data
+    elif isinstance(data, list):
+        for value in data:
+            yield from iter_dicts(value)
+
+
+def _strings(node, depth=2):
+    """Строковые значения словаря и вложенных в него словарей (без списков) до глубины depth."""
+    for value in node.values():
+        if isinstance(value, str):
+            yield value
+        elif isinstance(value, dict) and depth > 1:
+            yield from _strings(value, depth - 1)
+
+
+def find_links(data, is_detail, is_image, to_detail_url):
+    """Ищет в ответе API пары "URL изображения -> URL детальной страницы".
+
+    Схема ответа не задаётся: парой считаются строки одного объекта (или
+    его вложенных объектов), для которых срабатывают is_detail и is_image.
+    to_detail_url переводит найденное значение (путь, номер объекта) в
+    полный URL. Возвращает словарь в порядке появления объектов.
+    """
+    pairs = {}
+    for node in iter_dicts(data):
+        strings = list(_strings(node))
+        detail = next((value for value in strings if is_detail(value)), None)
+        image = next((value for value in strings if is_image(value)), None)
+        if detail and image and image not in pairs:
+            pairs[image] = to_detail_url(detail)
+    return pairs
+
+
+def next_page_url(url, items_on_page):
+    """Строит URL следующей страницы API по параметру номера страницы или смещения.
+
+    Возвращает None, если в URL нет известного параметра пагинации.
+    """
+    parts = urlparse(url)
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    for index, (name, value) in enumerate(params):
+        if not value.isdigit():
+            continue
+        if name.lower() in PAGE_PARAMS:
+            params[index] = (name, str(int(value) + 1))
+        elif name.lower() in OFFSET_PARAMS:
+            params[index] = (name, str(int(value) + items_on_page))
+        else:
+            continue
+        return urlunparse(parts._replace(query=urlencode(params)))
+    return None
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Границы корзин гистограмм длительности этапов (секунды)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами (как в Prometheus)."""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+
+    def quantile(self, q):
+        """Оценка квантиля по верхней границе корзины (для max - точное значение)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, bound in enumerate(BUCKETS):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    """Счётчики и гистограммы длительности этапов для обоих скраперов.
+
+    Этап замеряется через `with metrics.timed("driver_get"):`; исключение
+    внутри блока дополнительно считается в счётчике `<этап>_errors`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self.started_at = time.time()
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f"{stage}_errors")
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def snapshot(self):
+        """Возвращает {uptime, counters, stages: {этап: {count, total, mean, p50, p95, max}}} в секундах."""
+        with self._lock:
+            stages = {}
+            for stage, histogram in self._histograms.items():
+                stages[stage] = {
+                    "count": histogram.count,
+                    "total": round(histogram.sum, 3),
+                    "mean": round(histogram.sum / histogram.count, 4),
+                    "p50": round(histogram.quantile(0.5), 4),
+                    "p95": round(histogram.quantile(0.95), 4),
+                    "max": round(histogram.max, 4),
+                }
+            return {
+                "uptime": round(time.time() - self.started_at, 1),
+                "counters": dict(self._counters),
+                "stages": stages,
+            }
+
+    def prometheus_text(self, prefix="scraper"):
+        """Текущие значения в текстовом формате Prometheus."""
+        lines = []
+        with self._lock:
+            lines.append(f"# TYPE {prefix}_stage_seconds histogram")
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Общие метрики обоих скраперов
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_stats_file(path):
+    """Атомарно записывает снимок метрик в JSON-файл."""
+    temp_path = path + ".part"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(metrics.snapshot(), file, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+class MetricsExporter:
+    """Периодически пишет метрики в JSON-файл и/или отдаёт их по HTTP на /metrics.
+
+    stats_path=None отключает файл, port=None - HTTP-сервер.
+    """
+
+    def __init__(self, stats_path=None, interval=10, port=None, host="127.0.0.1"):
+        self.stats_path = stats_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+        if stats_path:
+            self._thread = threading.Thread(target=self._write_loop, name="metrics-file", daemon=True)
+            self._thread.start()
+        if port is not None:
+            self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+            logging.info(f"Метрики Prometheus: http://{host}:{self._server.server_address[1]}/metrics")
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                write_stats_file(self.stats_path)
+            except OSError as e:
+                logging.warning(f"Не удалось записать метрики в {self.stats_path}: {e}")
+
+    def close(self):
+        """Останавливает экспорт и записывает итоговый снимок."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            write_stats_file(self.stats_path)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,530 @@
+import re
+
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+
+from field_spec import compile_spec, element_text, exists
+from metrics import metrics
+
+# Кнопки аккордеонов на странице произведения и id блоков, которые они раскрывают
+ACCORDION_SECTIONS = {
+    "accordion-provenance": "provenance",
+    "accordion-inscription": "inscription",
+    "accordion-exhibition-history": "history",
+    "accordion-bibliography": "bibliography",
+    "accordion-related-content": "relatedpages",
+    "accordion-marks": "marks",
+    "accordion-technical": "technical",
+}
+
+# Кнопка, раскрывающая текстовое описание изображения
+IMAGE_DESCRIPTION_BUTTON = "drawer-control-0"
+
+# Без этих элементов страница считается не загруженной
+REQUIRED_SELECTORS = ["h1.object-title", ".object-attr.accession .object-attr-value"]
+
+# Парсер BeautifulSoup: "html.parser" (встроенный) или "lxml" (быстрее, нужен пакет lxml)
+HTML_PARSER = "html.parser"
+# Как извлекать поля из HTML: "soup" - поиском по BeautifulSoup,
+# "spec" - по NGA_FIELDS за один обход дерева lxml (нужен пакет lxml)
+EXTRACTOR = "soup"
+
+def set_parser(name, extractor="soup"):
+    """Выбирает парсер для parse_html и способ извлечения; ValueError, если нужный пакет не установлен."""
+    global HTML_PARSER, EXTRACTOR
+    if builder_registry.lookup(name) is None:
+        raise ValueError(f"Парсер {name!r} недоступен (для lxml: pip install lxml)")
+    if extractor not in ("soup", "spec"):
+        raise ValueError(f"Неизвестный способ извлечения: {extractor!r}")
+    if extractor == "spec" and builder_registry.lookup("lxml") is None:
+        raise ValueError("Для извлечения по спецификации нужен пакет lxml (pip install lxml)")
+    HTML_PARSER = name
+    EXTRACTOR = extractor
+
+def parse_html(html):
+    """Разбирает HTML в BeautifulSoup; уже разобранный документ возвращается как есть."""
+    if isinstance(html, BeautifulSoup):
+        return html
+    with metrics.timed("html_parse"):
+        return BeautifulSoup(html, HTML_PARSER)
+
+def missing_sections(html):
+    """Возвращает список того, чего не хватает в HTML для полного извлечения.
+
+    Страница неполная, если нет обязательных элементов или если кнопка
+    аккордеона есть, а его содержимое в разметку не попало.
+    """
+    soup = parse_html(html)
+    missing = [selector for selector in REQUIRED_SELECTORS if soup.select_one(selector) is None]
+    for button_id, section_id in ACCORDION_SECTIONS.items():
+        if soup.find(id=button_id) and not soup.find("div", id=section_id):
+            missing.append(section_id)
+    return missing
+
+def parse_detail_page(html):
+    """Разбирает страницу один раз: возвращает (недостающие разделы, поля произведения)."""
+    if EXTRACTOR == "spec":
+        values = _extract_fields(html)
+        return _spec_missing(values), _spec_record(values)
+    soup = parse_html(html)
+    return missing_sections(soup), extract_artwork_details(soup)
+
+def extract_artwork_details(html):
+    """Извлекает детальную информацию о произведении искусства из HTML-кода
+    страницы (аккордеоны должны быть уже раскрыты или отрендерены сервером)."""
+    if EXTRACTOR == "spec" and isinstance(html, str):
+        return _spec_record(_extract_fields(html))
+    soup = parse_html(html)
+
+    artwork_data = {}
+
+    def extract_text_or_none(element):
+        """Вспомогательная функция: возвращает текст из элемента или None, если элемента нет."""
+        return element.get_text(strip=True) if element else None
+
+    title_element = soup.select_one("h1.object-title")
+    if title_element:
+        title_text = title_element.get_text(strip=True).replace("\n", " ").replace(
+            "\r", ""
+        )
+        artwork_data["title"] = re.sub(
+            r",\s*\d{4}(-\d{4})?$", "", title_text
+        )
+
+    artwork_data["name_of_artist"] = extract_text_or_none(soup.select_one("p.attribution"))
+    artwork_data["date:"] = extract_text_or_none(soup.select_one("h1.object-title .date"))
+    artwork_data["on_view"] = extract_text_or_none(soup.select_one("p.onview"))
+    artwork_data["technique:"] = extract_text_or_none(soup.select_one(".object-attr.medium .object-attr-value"))
+    artwork_data["dimensions:"] = extract_text_or_none(soup.select_one(".object-attr.dimensions .object-attr-value"))
+    artwork_data["credit_line"] = extract_text_or_none(soup.select_one(".object-attr.credit .object-attr-value"))
+    artwork_data["accession_number"] = extract_text_or_none(soup.select_one(".object-attr.accession .object-attr-value"))
+    artwork_data["artist_nationality"] = extract_text_or_none(soup.select_one(".object-attr.artists-makers .nationality"))
+    artwork_data["image_use"] = extract_text_or_none(soup.select_one(".object-attr.image-use .object-attr-value"))
+    custom_prints_element = soup.select_one(".object-attr.prints .object-attr-value a")
+    artwork_data["custom_prints_link"] = custom_prints_element["href"] if custom_prints_element else None
+    artwork_data["copyright"] = extract_text_or_none(soup.select_one(".object-attr.copyright .object-attr-value"))
+    artwork_data["signature:"] = None # Добавляем поле "signature:" со значением None
+
+    # Извлекаем провенанс (Provenance)
+    provenance_text = []
+    provenance_div = soup.find('div', id='provenance')
+    if provenance_div:
+        h3_tag = provenance_div.find('h3', class_='heading-mimic-h6')
+        if h3_tag and h3_tag.get_text(strip=True) == 'Provenance':
+            p_tags = provenance_div.find_all('p')
+            for p in p_tags:
+                provenance_text.append(p.get_text(strip=True))
+
+    # Извлекаем "Associated Names" из раздела "Provenance"
+    associated_names_data = []
+    if provenance_div:
+        # Ищем все теги <a> внутри раздела "Provenance"
+        a_tags = provenance_div.find_all("a", href=True)
+        for a in a_tags:
+            name = a.get_text(strip=True)
+            link = a["href"]
+            if name and link:
+                associated_names_data.append(
+                    {"name": name, "link": f"https://www.nga.gov{link}"}
+                )
+
+    artwork_data["provenance"] = provenance_text
+    artwork_data["associated_names"] = associated_names_data
+
+    # Извлекаем подпись (Inscription)
+    inscription_list = []
+    inscription_div = soup.find('div', id='inscription')
+    if inscription_div:
+        h3_tag = inscription_div.find('h3', class_='heading-mimic-h6')
+        if h3_tag and h3_tag.get_text(strip=True) == 'Inscription':
+            p_tags = inscription_div.find_all('p')
+            for p in p_tags:
+                inscription_list.append(p.get_text(strip=True))
+    artwork_data["inscription"] = inscription_list
+
+    # Извлекаем историю выставок (Exhibition History)
+    exhibitions_text = []
+    history_div = soup.find('div', id='history')
+    if history_div:
+        h3_tag = history_div.find('h3', class_='heading-mimic-h6')
+        if h3_tag and h3_tag.get_text(strip=True) == 'Exhibition History':
+            dl_tags = history_div.find_all('dl', class_='year-list')
+            for dl in dl_tags:
+                exhibitions_text.append(re.sub(r'(\d{4})', r'\n\1 ', dl.get_text(strip=True)).strip())
+    artwork_data["exhibitions"] = exhibitions_text
+
+    # Извлекаем библиографию (Bibliography)
+    bibliography_text = []
+    bibliography_div = soup.find('div', id='bibliography')
+    if bibliography_div:
+        h3_tag = bibliography_div.find('h3', class_='heading-mimic-h6')
+        if h3_tag and h3_tag.get_text(strip=True) == 'Bibliography':
+            dl_tags = bibliography_div.find_all('dl', class_='year-list')
+            for dl in dl_tags:
+                bibliography_text.append(re.sub(r'(\d{4})', r'\n\1 ', dl.get_text(strip=True)).strip())
+    artwork_data["bibliography"] = bibliography_text
+
+    # Извлекаем related content
+    related_content_data = []
+    related_content_div = soup.find('div', id='relatedpages')
+    if related_content_div:
+        h3_tag = related_content_div.find('h3', class_='heading-mimic-h6')
+        if h3_tag and h3_tag.get_text(strip=True) == 'Related Content':
+            content_div = related_content_div.find('div', id='tmsRelatedContent')
+            if content_div:
+                links = content_div.find_all('a')
+                for link in links:
+                    related_content_data.append({
+                        "title": link.get_text(strip=True),
+                        "url": f"https://www.nga.gov{link.get('href')}"
+                    })
+    artwork_data["related_content"] = related_content_data
+
+    # Извлекаем описание изображения (image_description)
+    image_description_div = soup.find('div', class_='drawer-alttext')
+    if image_description_div:
+        content_div = image_description_div.find('div', id='drawer-content-0')
+        if content_div:
+            p_tag = content_div.find('p')
+            if p_tag:
+                artwork_data["image_description"] = p_tag.get_text(strip=True)
+            else:
+                artwork_data["image_description"] = None
+        else:
+            artwork_data["image_description"] = None
+    else:
+        artwork_data["image_description"] = None
+
+    # Извлекаем местоположение
+    on_view_text = artwork_data["on_view"]
+    if on_view_text and "Gallery" in on_view_text:
+        match = re.search(r"Gallery (\w+)", on_view_text)
+        if match:
+            artwork_data["location:"] = f"National Gallery of Art, {match.group(0)}"
+        else:
+            artwork_data["location:"] = on_view_text
+    else:
+      artwork_data["location:"] = None
+
+    # Извлекаем информацию об артисте
+    artist_info_div = soup.find('div', id='accordion-artists-makers')
+    if artist_info_div:
+        artist_name_element = artist_info_div.find('h3', class_='heading-mimic-h6')
+        artist_name = artist_name_element.get_text(strip=True) if artist_name_element else None
+        if artist_name:
+            artwork_data['artist_name'] = artist_name
+
+        # Извлекаем даты рождения и смерти артиста
+        birth_date_element = artist_info_div.find('span', class_='birth')
+        death_date_element = artist_info_div.find('span', class_='death')
+        artwork_data['artist_birth_date'] = birth_date_element.get_text(strip=True) if birth_date_element else None
+        artwork_data['artist_death_date'] = death_date_element.get_text(strip=True) if death_date_element else None
+
+    # Извлекаем дату приобретения
+    acquisition_div = soup.find('div', id='accordion-acquisition')
+    if acquisition_div:
+        acquisition_date_element = acquisition_div.find('span', class_='acquisition-date')
+        artwork_data['acquisition_date'] = acquisition_date_element.get_text(strip=True) if acquisition_date_element else None
+
+    # Извлекаем "Marks and Labels"
+    marks_and_labels_list = []
+    marks_and_labels_div = soup.find('div', id='marks')
+    if marks_and_labels_div:
+        h3_tag = marks_and_labels_div.find('h3', class_='heading-mimic-h6')
+        if h3_tag and h3_tag.get_text(strip=True) == 'Marks and Labels':
+            p_tags = marks_and_labels_div.find_all('p')
+            for p in p_tags:
+                marks_and_labels_list.append(p.get_text(strip=True))
+    artwork_data["marks_and_labels"] = marks_and_labels_list
+    
+    # Извлекаем "Technical Summary"
+    technical_summary_list = []
+    technical_summary_div = soup.find('div', id='technical')
+    if technical_summary_div:
+        h3_tag = technical_summary_div.find('h3', class_='heading-mimic-h6')
+        if h3_tag and h3_tag.get_text(strip=True) == 'Technical Summary':
+            p_tags = technical_summary_div.find_all('p')
+            for p in p_tags:
+                technical_summary_list.append(p.get_text(strip=True))
+    artwork_data["technical_summary"] = technical_summary_list
+
+    return artwork_data
+
+def _clean_title(text):
+    return re.sub(r",\s*\d{4}(-\d{4})?$", "", text.replace("\n", " ").replace("\r", ""))
+
+def _year_list(text):
+    return re.sub(r'(\d{4})', r'\n\1 ', text).strip()
+
+def _associated_name(element):
+    name = element_text(element)
+    link = element.get("href")
+    if name and link:
+        return {"name": name, "link": f"https://www.nga.gov{link}"}
+    return None
+
+def _related_link(element):
+    return {"title": element_text(element), "url": f"https://www.nga.gov{element.get('href')}"}
+
+def _accordion(section_id, title):
+    return ("div#" + section_id, "h3.heading-mimic-h6", title)
+
+# Декларативная спецификация полей детальной страницы NGA для EXTRACTOR = "spec"
+# (правила см. field_spec.FieldExtractor). Поля с "_" служебные и в запись не попадают;
+# результат совпадает с extract_artwork_details через BeautifulSoup.
+NGA_FIELDS = {
+    "title": {"select": "h1.object-title", "clean": _clean_title},
+    "name_of_artist": {"select": "p.attribution"},
+    "date:": {"select": "h1.object-title .date"},
+    "on_view": {"select": "p.onview"},
+    "technique:": {"select": ".object-attr.medium .object-attr-value"},
+    "dimensions:": {"select": ".object-attr.dimensions .object-attr-value"},
+    "credit_line": {"select": ".object-attr.credit .object-attr-value"},
+    "accession_number": {"select": ".object-attr.accession .object-attr-value"},
+    "artist_nationality": {"select": ".object-attr.artists-makers .nationality"},
+    "image_use": {"select": ".object-attr.image-use .object-attr-value"},
+    "custom_prints_link": {"select": ".object-attr.prints .object-attr-value a", "value": "@href"},
+    "copyright": {"select": ".object-attr.copyright .object-attr-value"},
+    "provenance": {"select": "p", "many": True, "section": _accordion("provenance", "Provenance")},
+    "associated_names": {"select": "div#provenance a", "many": True, "value": _associated_name},
+    "inscription": {"select": "p", "many": True, "section": _accordion("inscription", "Inscription")},
+    "exhibitions": {
+        "select": "dl.year-list", "many": True, "clean": _year_list,
+        "section": _accordion("history", "Exhibition History"),
+    },
+    "bibliography": {
+        "select": "dl.year-list", "many": True, "clean": _year_list,
+        "section": _accordion("bibliography", "Bibliography"),
+    },
+    "related_content": {
+        "select": "div#tmsRelatedContent a", "many": True, "value": _related_link,
+        "section": _accordion("relatedpages", "Related Content"),
+    },
+    "image_description": {"select": "div.drawer-alttext div#drawer-content-0 p"},
+    "artist_name": {"select": "div#accordion-artists-makers h3.heading-mimic-h6"},
+    "artist_birth_date": {"select": "div#accordion-artists-makers span.birth"},
+    "artist_death_date": {"select": "div#accordion-artists-makers span.death"},
+    "acquisition_date": {"select": "div#accordion-acquisition span.acquisition-date"},
+    "marks_and_labels": {"select": "p", "many": True, "section": _accordion("marks", "Marks and Labels")},
+    "technical_summary": {
+        "select": "p", "many": True, "section": _accordion("technical", "Technical Summary"),
+    },
+    "_artists_makers": {"select": "div#accordion-artists-makers", "value": exists},
+    "_acquisition": {"select": "div#accordion-acquisition", "value": exists},
+    "_required": {"select": REQUIRED_SELECTORS[0], "value": exists},
+    "_accession": {"select": REQUIRED_SELECTORS[1], "value": exists},
+}
+for _button_id, _section_id in ACCORDION_SECTIONS.items():
+    NGA_FIELDS["_button:" + _button_id] = {"select": "#" + _button_id, "value": exists}
+    NGA_FIELDS["_section:" + _section_id] = {"select": "div#" + _section_id, "value": exists}
+
+# Спецификация компилируется один раз при импорте
+NGA_EXTRACTOR = compile_spec(NGA_FIELDS)
+
+def _extract_fields(html):
+    with metrics.timed("html_parse"):
+        return NGA_EXTRACTOR.extract(html)
+
+def _spec_missing(values):
+    """То же, что missing_sections, по результату NGA_EXTRACTOR."""
+    missing = [
+        selector for selector, key in zip(REQUIRED_SELECTORS, ("_required", "_accession"))
+        if values[key] is None
+    ]
+    for button_id, section_id in ACCORDION_SECTIONS.items():
+        if values["_button:" + button_id] and not values["_section:" + section_id]:
+            missing.append(section_id)
+    return missing
+
+def _spec_record(values):
+    """Собирает из результата NGA_EXTRACTOR запись с теми же ключами, что extract_artwork_details."""
+    artwork_data = {}
+    if values["title"] is not None:
+        artwork_data["title"] = values["title"]
+    for key in (
+        "name_of_artist", "date:", "on_view", "technique:", "dimensions:", "credit_line",
+        "accession_number", "artist_nationality", "image_use", "custom_prints_link", "copyright",
+    ):
+        artwork_data[key] = values[key]
+    artwork_data["signature:"] = None
+    for key in (
+        "provenance", "associated_names", "inscription", "exhibitions", "bibliography",
+        "related_content", "image_description",
+    ):
+        artwork_data[key] = values[key]
+
+    on_view_text = values["on_view"]
+    if on_view_text and "Gallery" in on_view_text:
+        match = re.search(r"Gallery (\w+)", on_view_text)
+        artwork_data["location:"] = f"National Gallery of Art, {match.group(0)}" if match else on_view_text
+    else:
+        artwork_data["location:"] = None
+
+    if values["_artists_makers"]:
+        if values["artist_name"]:
+            artwork_data["artist_name"] = values["artist_name"]
+        artwork_data["artist_birth_date"] = values["artist_birth_date"]
+        artwork_data["artist_death_date"] = values["artist_death_date"]
+    if values["_acquisition"]:
+        artwork_data["acquisition_date"] = values["acquisition_date"]
+    artwork_data["marks_and_labels"] = values["marks_and_labels"]
+    artwork_data["technical_summary"] = values["technical_summary"]
+    return artwork_data
+
+# Скрипт для execute_async_script: за один запрос к WebDriver дожидается
+# заголовка, раскрывает все найденные аккордеоны и описание изображения и
+# возвращает те же поля, что и extract_artwork_details. Аргументы: пары
+# [id кнопки, id блока], id кнопки описания, таймаут в мс, флаг извлечения
+# (false - только раскрыть вкладки и вернуть список раскрытых).
+NGA_EXTRACT_SCRIPT = r"""
+const [sections, drawerButtonId, timeoutMs, extract] = arguments;
+const done = arguments[arguments.length - 1];
+const deadline = Date.now() + timeoutMs;
+
+function text(el) {
+  if (!el) return null;
+  const parts = [];
+  const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+  while (walker.nextNode()) {
+    const t = walker.currentNode.nodeValue.trim();
+    if (t) parts.push(t);
+  }
+  return parts.join("");
+}
+const one = (sel, root) => (root || document).querySelector(sel);
+const all = (sel, root) => Array.from((root || document).querySelectorAll(sel));
+const years = (s) => s.replace(/(\d{4})/g, "\n$1 ").trim();
+
+function section(id, heading) {
+  const div = one("div#" + id);
+  if (!div) return null;
+  const h3 = one("h3.heading-mimic-h6", div);
+  return h3 && text(h3) === heading ? div : null;
+}
+
+function collect() {
+  const data = {};
+  const title = one("h1.object-title");
+  if (title) {
+    data["title"] = text(title).replace(/\n/g, " ").replace(/\r/g, "")
+      .replace(/,\s*\d{4}(-\d{4})?$/, "");
+  }
+  data["name_of_artist"] = text(one("p.attribution"));
+  data["date:"] = text(one("h1.object-title .date"));
+  data["on_view"] = text(one("p.onview"));
+  data["technique:"] = text(one(".object-attr.medium .object-attr-value"));
+  data["dimensions:"] = text(one(".object-attr.dimensions .object-attr-value"));
+  data["credit_line"] = text(one(".object-attr.credit .object-attr-value"));
+  data["accession_number"] = text(one(".object-attr.accession .object-attr-value"));
+  data["artist_nationality"] = text(one(".object-attr.artists-makers .nationality"));
+  data["image_use"] = text(one(".object-attr.image-use .object-attr-value"));
+  const prints = one(".object-attr.prints .object-attr-value a");
+  data["custom_prints_link"] = prints ? prints.getAttribute("href") : null;
+  data["copyright"] = text(one(".object-attr.copyright .object-attr-value"));
+  data["signature:"] = null;
+
+  const provenance = section("provenance", "Provenance");
+  data["provenance"] = provenance ? all("p", provenance).map(text) : [];
+  const provenanceDiv = one("div#provenance");
+  data["associated_names"] = provenanceDiv
+    ? all("a[href]", provenanceDiv)
+        .map((a) => ({ name: text(a), link: a.getAttribute("href") }))
+        .filter((a) => a.name && a.link)
+        .map((a) => ({ name: a.name, link: "https://www.nga.gov" + a.link }))
+    : [];
+
+  const inscription = section("inscription", "Inscription");
+  data["inscription"] = inscription ? all("p", inscription).map(text) : [];
+  const history = section("history", "Exhibition History");
+  data["exhibitions"] = history ? all("dl.year-list", history).map((dl) => years(text(dl))) : [];
+  const bibliography = section("bibliography", "Bibliography");
+  data["bibliography"] = bibliography
+    ? all("dl.year-list", bibliography).map((dl) => years(text(dl)))
+    : [];
+
+  const related = section("relatedpages", "Related Content");
+  const relatedContent = related ? one("div#tmsRelatedContent", related) : null;
+  data["related_content"] = relatedContent
+    ? all("a", relatedContent).map((a) => ({
+        title: text(a),
+        url: "https://www.nga.gov" + a.getAttribute("href"),
+      }))
+    : [];
+
+  const drawer = one("div.drawer-alttext");
+  const drawerContent = drawer ? one("div#drawer-content-0", drawer) : null;
+  const drawerText = drawerContent ? one("p", drawerContent) : null;
+  data["image_description"] = drawerText ? text(drawerText) : null;
+
+  const onView = data["on_view"];
+  if (onView && onView.includes("Gallery")) {
+    const match = onView.match(/Gallery (\w+)/);
+    data["location:"] = match ? "National Gallery of Art, " + match[0] : onView;
+  } else {
+    data["location:"] = null;
+  }
+
+  const artist = one("div#accordion-artists-makers");
+  if (artist) {
+    const name = text(one("h3.heading-mimic-h6", artist));
+    if (name) data["artist_name"] = name;
+    data["artist_birth_date"] = text(one("span.birth", artist));
+    data["artist_death_date"] = text(one("span.death", artist));
+  }
+  const acquisition = one("div#accordion-acquisition");
+  if (acquisition) {
+    data["acquisition_date"] = text(one("span.acquisition-date", acquisition));
+  }
+
+  const marks = section("marks", "Marks and Labels");
+  data["marks_and_labels"] = marks ? all("p", marks).map(text) : [];
+  const technical = section("technical", "Technical Summary");
+  data["technical_summary"] = technical ? all("p", technical).map(text) : [];
+  return data;
+}
+
+function expand() {
+  const expanded = [];
+  for (const [buttonId, sectionId] of sections) {
+    const button = document.getElementById(buttonId);
+    if (button) {
+      button.click();
+      expanded.push(sectionId);
+    }
+  }
+  if (one("div.drawer-alttext")) {
+    const drawerButton = document.getElementById(drawerButtonId);
+    if (drawerButton) drawerButton.click();
+  }
+  return expanded;
+}
+
+function finish(expanded) {
+  // Ждём, пока содержимое раскрытых вкладок появится в DOM
+  if (Date.now() < deadline && expanded.some((id) => !one("div#" + id))) {
+    setTimeout(() => finish(expanded), 50);
+    return;
+  }
+  done(extract ? collect() : expanded);
+}
+
+(function start() {
+  if (!one("h1.object-title") && Date.now() < deadline) {
+    setTimeout(start, 50);
+    return;
+  }
+  if (!one("h1.object-title")) {
+    done(null);
+    return;
+  }
+  finish(expand());
+})();
+"""
+
+
+def diff_records(expected, actual):
+    """Возвращает список полей, значения которых различаются в двух записях."""
+    return sorted(
+        key for key in set(expected) | set(actual)
+        if expected.get(key) != actual.get(key)
+    )
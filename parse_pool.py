@@ -0,0 +1,49 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import nga_parser
+from metrics import metrics
+
+
+def _parse_task(func, html):
+    started = time.perf_counter()
+    result = func(html)
+    return result, time.perf_counter() - started
+
+
+class ParsePool:
+    """Отдельный этап разбора HTML в пуле процессов.
+
+    Потоки, которые управляют браузером и скачивают страницы, передают сюда
+    сырой HTML и ждут готовую запись, а разбор идёт в других процессах и не
+    держит GIL. `func` - функция уровня модуля (её передают в процессы).
+    С workers=0 разбор выполняется в вызывающем потоке, без процессов.
+    """
+
+    def __init__(self, workers=None, parser="html.parser", extractor="soup"):
+        nga_parser.set_parser(parser, extractor)
+        self._executor = None
+        if workers != 0:
+            # Процессы запускаются из потоков воркеров, поэтому "spawn", а не fork:
+            # форк многопоточного процесса может унаследовать захваченные блокировки
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=nga_parser.set_parser,
+                initargs=(parser, extractor),
+            )
+
+    def run(self, func, html):
+        """Выполняет func(html) в пуле и возвращает результат."""
+        if self._executor is None:
+            return func(html)
+        with metrics.timed("parse_wait"):
+            result, seconds = self._executor.submit(_parse_task, func, html).result()
+        # Замеры внутри процессов в общие метрики не попадают, поэтому время разбора пишется здесь
+        metrics.observe("html_parse", seconds)
+        return result
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
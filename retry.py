@@ -0,0 +1,156 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from governor import host_key
+from metrics import metrics
+
+# HTTP-статусы, после которых запрос имеет смысл повторить
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    """Запрос не выполнен: цепь для хоста разомкнута после серии ошибок."""
+
+
+def is_transient_http_error(exc):
+    """True для сетевых ошибок, таймаутов, оборванных ответов и ответов 429/5xx."""
+    if isinstance(exc, (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+    )):
+        return True
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return exc.response.status_code in RETRYABLE_STATUSES
+    return False
+
+
+class CircuitBreaker:
+    """Предохранитель для одного хоста.
+
+    После `failure_threshold` ошибок подряд цепь размыкается на
+    `reset_timeout` секунд: новые запросы к хосту не отправляются. Затем
+    пропускается один пробный запрос: успех замыкает цепь, ошибка снова
+    размыкает её.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Возвращает 0, если запрос можно отправить, иначе сколько секунд подождать."""
+        with self._lock:
+            if self.opened_at is None:
+                return 0
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self._probing:
+                return 0.5
+            self._probing = True
+            return 0
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                logging.info(f"Цепь для {self.name} снова замкнута.")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._probing:
+                    metrics.inc("circuit_opened")
+                    logging.warning(
+                        f"Цепь для {self.name} разомкнута на {self.reset_timeout} с после {self.failures} ошибок."
+                    )
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self):
+        """Снимает пробный запрос, если он завершился ошибкой, не связанной с хостом."""
+        with self._lock:
+            self._probing = False
+
+
+class Breakers:
+    """Предохранители по хостам (группировка как у governor)."""
+
+    def __init__(self, **options):
+        self.options = options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    def for_url(self, url):
+        key = host_key(url)
+        with self._lock:
+            if key not in self._breakers:
+                self._breakers[key] = CircuitBreaker(key, **self.options)
+            return self._breakers[key]
+
+
+# Общие предохранители для обоих скраперов
+breakers = Breakers()
+
+
+def retry_call(func, url, retry_if=is_transient_http_error, attempts=3,
+               base_delay=1.0, max_delay=30.0, breaker_wait=120.0):
+    """Вызывает func() с повторами при временных ошибках.
+
+    Между попытками - экспоненциальная пауза со случайным разбросом
+    (full jitter). Ошибки, для которых retry_if возвращает True, считаются
+    отказами хоста и учитываются предохранителем; при разомкнутой цепи вызов
+    ждёт её проверки не дольше breaker_wait секунд, затем бросает
+    CircuitOpenError; время ожидания пишется в метрику breaker_wait.
+    Остальные исключения пробрасываются сразу.
+    """
+    breaker = breakers.for_url(url)
+    for attempt in range(1, attempts + 1):
+        waited = 0.0
+        while True:
+            delay = breaker.allow()
+            if delay <= 0:
+                break
+            if waited >= breaker_wait:
+                metrics.observe("breaker_wait", waited)
+                raise CircuitOpenError(f"Цепь для {breaker.name} разомкнута, {url} не запрошен")
+            step = min(delay, 1.0)
+            time.sleep(step)
+            waited += step
+        if waited:
+            metrics.observe("breaker_wait", waited)
+
+        try:
+            result = func()
+        except Exception as e:
+            if not retry_if(e):
+                breaker.release_probe()
+                raise
+            breaker.record_failure()
+            if attempt == attempts:
+                raise
+            metrics.inc("retries")
+            pause = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            logging.warning(
+                f"Попытка {attempt} из {attempts} для {url} не удалась ({e}), повтор через {pause:.1f} с"
+            )
+            time.sleep(pause)
+        else:
+            breaker.record_success()
+            return result
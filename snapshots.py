@@ -0,0 +1,78 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from storage import JsonLinesWriter, iter_jsonl
+
+
+class SnapshotArchive:
+    """Архив HTML детальных страниц (с уже раскрытыми вкладками) для повторного разбора.
+
+    Содержимое хранится сжатым по адресу содержимого: `blobs/<sha256[:2]>/<sha256>.html.gz`,
+    поэтому одинаковые страницы занимают место один раз. В `index.jsonl`
+    на каждую загрузку пишется строка {url, fetched_at, sha256, source}.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.jsonl")
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        self._index = JsonLinesWriter(self.index_path, fsync_every=100, mode="a")
+
+    def blob_path(self, digest):
+        return os.path.join(self.directory, "blobs", digest[:2], digest + ".html.gz")
+
+    def store(self, url, html, source):
+        """Сохраняет снимок страницы и возвращает sha256 её содержимого."""
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            folder = os.path.dirname(path)
+            os.makedirs(folder, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=folder, delete=False) as file:
+                file.write(gzip.compress(data, compresslevel=6))
+            os.replace(file.name, path)
+
+        self._index.write({"url": url, "fetched_at": time.time(), "sha256": digest, "source": source})
+        return digest
+
+    def latest(self):
+        """Возвращает {url: запись индекса} с последним снимком каждого URL."""
+        entries = {}
+        for entry in iter_jsonl(self.index_path):
+            current = entries.get(entry["url"])
+            if current is None or entry["fetched_at"] >= current["fetched_at"]:
+                entries[entry["url"]] = entry
+        return entries
+
+    def close(self):
+        self._index.close()
+
+
+def load_snapshot(path):
+    with gzip.open(path, "rb") as file:
+        return file.read().decode("utf-8")
+
+
+def _extract_snapshot(task):
+    url, path, extract = task
+    return url, extract(load_snapshot(path))
+
+
+def reparse(archive, extract, workers=None, initializer=None, initargs=()):
+    """Заново извлекает поля из последнего снимка каждого URL в пуле процессов.
+
+    `extract` - функция уровня модуля (её передают в процессы), которая
+    принимает HTML и возвращает словарь полей; `initializer(*initargs)`
+    вызывается в каждом процессе перед разбором. Возвращает {url: поля}.
+    """
+    tasks = [
+        (url, archive.blob_path(entry["sha256"]), extract)
+        for url, entry in archive.latest().items()
+    ]
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        return dict(executor.map(_extract_snapshot, tasks, chunksize=16))
@@ -0,0 +1,276 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from metrics import metrics
+
+
+class JsonLinesWriter:
+    """Потокобезопасная запись записей в файл JSON Lines (одна запись - одна строка).
+
+    Каждая запись сразу сбрасывается в ОС, а fsync выполняется раз в
+    `fsync_every` записей и при закрытии, поэтому при падении процесса
+    теряется не больше одной неполной строки.
+    """
+
+    def __init__(self, path, fsync_every=20, mode="a"):
+        self.path = path
+        self.fsync_every = fsync_every
+        self._file = open(path, mode, encoding="utf-8")
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self.count = 0
+
+    def write(self, record):
+        with metrics.timed("json_write"):
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            with self._lock:
+                self._file.write(line)
+                self._file.flush()
+                self.count += 1
+                self._unsynced += 1
+                if self._unsynced >= self.fsync_every:
+                    os.fsync(self._file.fileno())
+                    self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_jsonl(path):
+    """Читает записи из файла JSON Lines, пропуская пустые и оборванные строки."""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Последняя строка могла не дописаться при падении
+                continue
+
+
+def url_key(url, prefix):
+    """Стабильный ключ записи по хэшу URL (когда в URL нет номера объекта)."""
+    return f"{prefix}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}"
+
+
+def export_json_array(jsonl_path, json_path, sort_key=None, unique_key=None, alias=None):
+    """Собирает файл JSON Lines в обычный JSON-массив с отступами (прежний формат вывода).
+
+    Если задан `unique_key`, из записей с одинаковым ключом остаётся
+    последняя (после перезапуска обхода запись может быть дописана повторно),
+    а ключи, последняя запись которых - {"removed": true}, исключаются.
+    Если задан `alias`, после сортировки записи получают в этом поле
+    порядковый номер с 1 (поле ставится первым). Возвращает количество записей.
+    """
+    records = list(iter_jsonl(jsonl_path))
+    if unique_key is not None:
+        records = list({unique_key(record): record for record in records}.values())
+        # Запись {"removed": true} отмечает, что объект исчез с сайта
+        records = [record for record in records if not record.get("removed")]
+    if sort_key is not None:
+        records.sort(key=sort_key)
+    if alias is not None:
+        records = [
+            {alias: number, **{key: value for key, value in record.items() if key != alias}}
+            for number, record in enumerate(records, start=1)
+        ]
+
+    temp_path = json_path + ".part"
+    with open(temp_path, "w", encoding="utf-8") as json_file:
+        json.dump(records, json_file, indent=4, ensure_ascii=False)
+    os.replace(temp_path, json_path)
+    return len(records)
+
+
+class CrawlState:
+    """Состояние обхода в SQLite: статус каждого URL, число попыток и куда записан результат.
+
+    Позволяет перезапущенному обходу пропустить уже обработанные URL и
+    повторить только неудачные. Столбец item_id остался от сквозной
+    нумерации (записи теперь называются стабильными ключами) и не заполняется.
+
+    URL, которые не удалось обработать и после всех повторов, получают
+    статус DEAD (список "мёртвых писем"): обычный запуск их пропускает, а
+    повторно они обрабатываются только по отдельной команде.
+    """
+
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    DONE = "done"
+    FAILED = "failed"
+    DEAD = "dead"
+
+    # Хэши содержимого записей для инкрементального обхода (см. changes.ChangeTracker)
+    CONTENT_COLUMNS = ("listing_hash", "page_hash", "field_hashes", "image_hash")
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                item_id INTEGER,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                output TEXT,
+                error TEXT,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS content (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                listing_hash TEXT,
+                page_hash TEXT,
+                field_hashes TEXT,
+                image_hash TEXT,
+                seen_run INTEGER,
+                updated_at REAL
+            );
+            """
+        )
+        # URL, которые были в работе при падении, снова считаются ожидающими
+        self._db.execute(
+            "UPDATE urls SET status = ? WHERE status = ?", (self.PENDING, self.IN_PROGRESS)
+        )
+        self._db.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def get_meta(self, key, default=None):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else default
+
+    def set_meta(self, key, value):
+        self._execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    def status(self, url):
+        rows = self._query("SELECT status FROM urls WHERE url = ?", (url,))
+        return rows[0][0] if rows else None
+
+    def is_done(self, url):
+        return self.status(url) == self.DONE
+
+    def attempts(self, url):
+        rows = self._query("SELECT attempts FROM urls WHERE url = ?", (url,))
+        return rows[0][0] if rows else 0
+
+    def mark_started(self, url):
+        """Отмечает начало очередной попытки обработки URL."""
+        self._execute(
+            "INSERT INTO urls (url, status, attempts, updated_at) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT(url) DO UPDATE SET status = excluded.status, "
+            "attempts = attempts + 1, updated_at = excluded.updated_at",
+            (url, self.IN_PROGRESS, time.time()),
+        )
+
+    def mark_done(self, url, output=None):
+        self._execute(
+            "UPDATE urls SET status = ?, output = ?, error = NULL, updated_at = ? WHERE url = ?",
+            (self.DONE, output, time.time(), url),
+        )
+
+    def mark_failed(self, url, error=None):
+        self._execute(
+            "UPDATE urls SET status = ?, error = ?, updated_at = ? WHERE url = ?",
+            (self.FAILED, str(error) if error is not None else None, time.time(), url),
+        )
+
+    def mark_dead(self, url, error=None):
+        """Переносит URL в список "мёртвых писем" после исчерпания повторов."""
+        self._execute(
+            "UPDATE urls SET status = ?, error = ?, updated_at = ? WHERE url = ?",
+            (self.DEAD, str(error) if error is not None else None, time.time(), url),
+        )
+
+    def dead_letters(self):
+        """Возвращает список (url, попытки, последняя ошибка) для URL со статусом DEAD."""
+        return self._query(
+            "SELECT url, attempts, error FROM urls WHERE status = ? ORDER BY updated_at",
+            (self.DEAD,),
+        )
+
+    def urls(self, status):
+        """Возвращает список URL с указанным статусом."""
+        return [row[0] for row in self._query("SELECT url FROM urls WHERE status = ?", (status,))]
+
+    def content(self, key):
+        """Возвращает сохранённые хэши записи {столбец: значение} или None."""
+        rows = self._query(
+            f"SELECT url, {', '.join(self.CONTENT_COLUMNS)}, seen_run FROM content WHERE key = ?", (key,)
+        )
+        if not rows:
+            return None
+        return dict(zip(("url",) + self.CONTENT_COLUMNS + ("seen_run",), rows[0]))
+
+    def save_content(self, key, **hashes):
+        """Обновляет переданные хэши записи (столбцы из CONTENT_COLUMNS)."""
+        columns = [column for column in self.CONTENT_COLUMNS if column in hashes]
+        self._execute(
+            f"UPDATE content SET {', '.join(f'{column} = ?' for column in columns)}, updated_at = ? WHERE key = ?",
+            [hashes[column] for column in columns] + [time.time(), key],
+        )
+
+    def mark_seen(self, key, url, run):
+        """Отмечает, что запись есть в списке на обходе номер `run` (новая запись создаётся)."""
+        self._execute(
+            "INSERT INTO content (key, url, seen_run, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET url = excluded.url, seen_run = excluded.seen_run",
+            (key, url, run, time.time()),
+        )
+
+    def unseen(self, run):
+        """Записи с сохранёнными полями, которых не было в списке на обходе `run`: [(ключ, URL)]."""
+        return self._query(
+            "SELECT key, url FROM content WHERE field_hashes IS NOT NULL AND (seen_run IS NULL OR seen_run < ?)",
+            (run,),
+        )
+
+    def forget_content(self, key):
+        self._execute("DELETE FROM content WHERE key = ?", (key,))
+
+    def counts(self):
+        """Возвращает словарь {статус: количество URL}."""
+        return dict(self._query("SELECT status, COUNT(*) FROM urls GROUP BY status"))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
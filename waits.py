@@ -0,0 +1,135 @@
+import threading
+import time
+
+from selenium.common.exceptions import JavascriptException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Ждёт, пока DOM не будет меняться quiet_ms миллисекунд (или до timeout_ms).
+# Возвращает true, если тишина наступила, и false по таймауту.
+DOM_QUIET_SCRIPT = """
+const [quietMs, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const started = Date.now();
+let last = Date.now();
+const observer = new MutationObserver(() => { last = Date.now(); });
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+(function check() {
+  const now = Date.now();
+  if (now - last >= quietMs || now - started >= timeoutMs) {
+    observer.disconnect();
+    done(now - last >= quietMs);
+    return;
+  }
+  setTimeout(check, Math.min(50, quietMs));
+})();
+"""
+
+# Ждёт, пока за idle_ms миллисекунд не завершится ни одного нового запроса
+# (по Resource Timing) и документ не будет загружен полностью.
+NETWORK_IDLE_SCRIPT = """
+const [idleMs, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const started = Date.now();
+let count = performance.getEntriesByType("resource").length;
+let last = Date.now();
+(function check() {
+  const now = Date.now();
+  const current = performance.getEntriesByType("resource").length;
+  if (current !== count) {
+    count = current;
+    last = now;
+  }
+  const idle = document.readyState === "complete" && now - last >= idleMs;
+  if (idle || now - started >= timeoutMs) {
+    done(idle);
+    return;
+  }
+  setTimeout(check, Math.min(50, idleMs));
+})();
+"""
+
+
+class WaitStats:
+    """Сколько на самом деле длилось каждое ожидание (по имени ожидания)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, seconds, timed_out=False):
+        with self._lock:
+            stats = self._stats.setdefault(
+                name, {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0}
+            )
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            if timed_out:
+                stats["timeouts"] += 1
+
+    def summary(self):
+        """Возвращает {имя: {count, mean, max, total, timeouts}} в секундах."""
+        with self._lock:
+            return {
+                name: {
+                    "count": stats["count"],
+                    "mean": round(stats["total"] / stats["count"], 3),
+                    "max": round(stats["max"], 3),
+                    "total": round(stats["total"], 3),
+                    "timeouts": stats["timeouts"],
+                }
+                for name, stats in self._stats.items()
+            }
+
+
+# Общая статистика ожиданий для обоих скраперов
+wait_stats = WaitStats()
+
+
+def wait_until(driver, condition, timeout, name, poll=0.1):
+    """Ждёт условие WebDriverWait не дольше timeout секунд и записывает длительность.
+
+    Возвращает результат условия или None по таймауту.
+    """
+    started = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=poll).until(condition)
+    except TimeoutException:
+        wait_stats.record(name, time.monotonic() - started, timed_out=True)
+        return None
+    wait_stats.record(name, time.monotonic() - started)
+    return result
+
+
+def wait_for_new_items(driver, css_selector, previous_count, timeout=5, name=None):
+    """Ждёт, пока элементов по селектору станет больше previous_count.
+
+    Возвращает новое количество или None по таймауту.
+    """
+    def more_items(driver):
+        count = len(driver.find_elements(By.CSS_SELECTOR, css_selector))
+        return count if count > previous_count else False
+
+    return wait_until(driver, more_items, timeout, name or f"new_items:{css_selector}")
+
+
+def _wait_script(driver, script, name, quiet_ms, timeout):
+    started = time.monotonic()
+    driver.set_script_timeout(timeout + 5)
+    try:
+        settled = bool(driver.execute_async_script(script, quiet_ms, int(timeout * 1000)))
+    except (JavascriptException, TimeoutException):
+        settled = False
+    wait_stats.record(name, time.monotonic() - started, timed_out=not settled)
+    return settled
+
+
+def wait_for_dom_quiet(driver, quiet_ms=300, timeout=5, name="dom_quiet"):
+    """Ждёт, пока DOM перестанет меняться на quiet_ms мс. Возвращает False по таймауту."""
+    return _wait_script(driver, DOM_QUIET_SCRIPT, name, quiet_ms, timeout)
+
+
+def wait_for_network_idle(driver, idle_ms=500, timeout=10, name="network_idle"):
+    """Ждёт загрузки документа и паузы в сетевых запросах на idle_ms мс. Возвращает False по таймауту."""
+    return _wait_script(driver, NETWORK_IDLE_SCRIPT, name, idle_ms, timeout)